@@ -1,34 +1,90 @@
 from __future__ import annotations
 
 import os
+import re
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
+from sqlalchemy import Index, event
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
 
 class Track(SQLModel, table=True):
+    # Keyset pagination of /api/downloads walks these newest-first
+    __table_args__ = (
+        Index("ix_track_requested_at_id", "requested_at", "id"),
+        Index("ix_track_status_requested_at", "status", "requested_at"),
+        Index("ix_track_source_requested_at", "source", "requested_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     spotify_id: Optional[str] = Field(default=None, index=True)
     title: str
     artist: Optional[str] = None
     album: Optional[str] = None
-    # queued | downloading | done | failed | skipped
+    # From Spotify (playlists / Exportify CSV); used to score YouTube candidates
+    duration_ms: Optional[int] = None
+    isrc: Optional[str] = None
+    # queued | downloading | done | failed | skipped | missing (file deleted from the library)
     status: str = Field(default="queued", index=True)
     file_path: Optional[str] = None
+    # Resolved by the search stage so retries don't have to search again
+    youtube_url: Optional[str] = None
     error_msg: Optional[str] = None
+    # rate_limited | not_found | extractor | ffmpeg | invalid | error (see pipeline._fail)
+    error_kind: Optional[str] = None
+    # Transient failures go back to "queued" and are not claimed again before next_attempt_at
+    attempts: int = Field(default=0)
+    next_attempt_at: Optional[datetime] = None
+    # Normalised "artist|title" (see make_dedup_key) for index-backed duplicate checks
+    dedup_key: Optional[str] = Field(default=None, index=True)
     # playlist | manual
     source: str = Field(default="manual")
     requested_at: datetime = Field(default_factory=datetime.utcnow)
     downloaded_at: Optional[datetime] = None
 
 
+def _normalize(text: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def make_dedup_key(artist: Optional[str], title: Optional[str]) -> str:
+    """Case-, accent- and punctuation-insensitive artist + title key."""
+    return f"{_normalize(artist)}|{_normalize(title)}"
+
+
+@event.listens_for(Track, "before_insert")
+def _fill_dedup_key(mapper, connection, target: Track) -> None:
+    if target.dedup_key is None:
+        target.dedup_key = make_dedup_key(target.artist, target.title)
+
+
+class TrackStatusCount(SQLModel, table=True):
+    """Number of tracks per status, maintained by triggers (see migrations)."""
+    status: str = Field(primary_key=True)
+    count: int = Field(default=0)
+
+
 class Settings(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     quality: str = Field(default="320")
     file_template: str = Field(default="{artist} - {title}")
     sleep_between_downloads: int = Field(default=7)
     max_retries: int = Field(default=3)
+    # Concurrency of each download pipeline stage (search → download → transcode)
+    search_workers: int = Field(default=2)
+    download_workers: int = Field(default=2)
+    transcode_workers: int = Field(default=2)
+    # Skip downloads that are acoustically the same recording as a library file (needs fpcalc)
+    fingerprint_dedup: bool = Field(default=False)
+    # mp3: re-encode anything that isn't MP3 | native: keep YouTube's M4A/Opus stream as is
+    output_format: str = Field(default="mp3")
 
 
 class MonitoredPlaylist(SQLModel, table=True):
@@ -37,11 +93,52 @@ class MonitoredPlaylist(SQLModel, table=True):
     name: Optional[str] = None
     url: str
     track_count: int = Field(default=0)
+    # Spotify's playlist version; unchanged snapshot → skip fetching the items
+    snapshot_id: Optional[str] = None
     last_synced_at: Optional[datetime] = None
     sync_error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class SearchCache(SQLModel, table=True):
+    # Normalised search query (see search_cache.normalize_query)
+    query_key: str = Field(primary_key=True)
+    # JSON list of flat yt-dlp candidate entries
+    entries: str = Field(default="[]")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class LibraryFile(SQLModel, table=True):
+    """One audio file under OUTPUT_DIR, kept current by the library scanner."""
+    # Relative to OUTPUT_DIR so the index survives moving the music volume
+    path: str = Field(primary_key=True)
+    size: int
+    mtime: float
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    dedup_key: Optional[str] = Field(default=None, index=True)
+    scanned_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Fingerprint(SQLModel, table=True):
+    """Chromaprint fingerprint of one audio file, keyed by a hash of its contents."""
+    file_hash: str = Field(primary_key=True)
+    path: str = Field(index=True)
+    # Whole seconds; candidates for a match are looked up by duration first
+    duration: int = Field(index=True)
+    # Raw Chromaprint frames as packed unsigned 32-bit ints
+    fingerprint: bytes
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class FingerprintKey(SQLModel, table=True):
+    """Sampled frame values of a Fingerprint; files sharing several keys are match candidates."""
+    key: int = Field(primary_key=True)
+    file_hash: str = Field(primary_key=True)
+
+
 class SpotifyOAuth(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     access_token: str
@@ -52,10 +149,52 @@ class SpotifyOAuth(SQLModel, table=True):
 
 
 DB_PATH = os.environ.get("DB_PATH", "/data/db.sqlite")
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+engine = create_engine(
+    f"sqlite:///{DB_PATH}",
+    # timeout is the driver's busy timeout in seconds; matches PRAGMA busy_timeout below
+    connect_args={"check_same_thread": False, "timeout": 30},
+)
+
+# ---------------------------------------------------------------------------
+# SQLite tuning
+#
+# WAL lets the status polls and page loads read while the pipeline, imports
+# and scheduler jobs write. SQLite still allows a single writer at a time:
+# small writes simply wait on busy_timeout, while bulk writers (imports,
+# library scans, playlist jobs) take write_lock so they queue up in Python
+# instead of all spinning on the database lock.
+# ---------------------------------------------------------------------------
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # Durable across application crashes; only an OS crash can lose the last commits
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MiB per connection
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+write_lock = threading.RLock()
+
+
+@event.listens_for(engine, "connect")
+def _configure_connection(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in _PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+@contextmanager
+def write_session() -> Iterator[Session]:
+    """A session for bulk writes that holds write_lock for its whole lifetime."""
+    with write_lock, Session(engine) as session:
+        yield session
 
 
 def create_db_and_tables() -> None:
+    """Create missing tables; columns, indexes and triggers come from migrations.run_migrations()."""
     SQLModel.metadata.create_all(engine)
 
 
@@ -72,3 +211,23 @@ def get_settings(session: Session) -> Settings:
         session.commit()
         session.refresh(settings)
     return settings
+
+
+# Every open dashboard and the metrics scraper poll these; within the TTL they share one read
+_COUNTS_TTL_SEC = 2.0
+
+_counts_lock = threading.Lock()
+_counts: dict[str, int] = {}
+_counts_at = 0.0
+
+
+def get_status_counts() -> dict[str, int]:
+    """Track counts per status from the trigger-maintained counter table, cached for a short TTL."""
+    global _counts, _counts_at
+    with _counts_lock:
+        if time.monotonic() - _counts_at > _COUNTS_TTL_SEC:
+            with Session(engine) as session:
+                rows = session.exec(select(TrackStatusCount.status, TrackStatusCount.count)).all()
+            _counts = dict(rows)
+            _counts_at = time.monotonic()
+        return _counts
@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import os
 import re
+import threading
 import time
-import random
 from datetime import datetime
 from typing import Optional
 
 import yt_dlp
 import mutagen
-from mutagen.easyid3 import EasyID3
-from mutagen.id3 import ID3NoHeaderError
+from mutagen.oggopus import OggOpus
+
+from . import metrics, ratelimit, search_cache
+from .transcode import convert_to_mp3, remux_audio
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -57,11 +59,29 @@ def sanitize_filename(template: str, title: str, artist: str, album: str) -> str
 # YouTube search
 # ---------------------------------------------------------------------------
 
+class _YdlLogger:
+    """Passes yt-dlp's error output to the rate limiter so throttling is noticed wherever it happens."""
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        if ratelimit.is_throttle_error(msg):
+            ratelimit.record_throttle(msg)
+
+
 def _common_opts() -> dict:
     """Options shared by both search and download."""
     opts = {
         "quiet": True,
         "no_warnings": True,
+        "logger": _YdlLogger(),
         "nocheckcertificate": True,
         "geo_bypass": True,
         "http_headers": {
@@ -85,19 +105,18 @@ def _ydl_search_opts(n: int = 5) -> dict:
     }
 
 
-def _ydl_download_opts(output_base: str, quality: str, sleep_sec: int, max_retries: int) -> dict:
-    """Options for actual audio download — uses android_vr to bypass bot checks."""
+def _ydl_download_opts(max_retries: int) -> dict:
+    """
+    Options for actual audio download — uses android_vr to bypass bot checks.
+
+    No postprocessors: transcoding runs as a separate pipeline stage so a slow
+    encode never holds up the next network download.  The output template is
+    set per download (see fetch_audio) so one instance can serve many tracks.
+    Pacing is left to the shared rate limiter instead of yt-dlp's sleep options.
+    """
     return {
         **_common_opts(),
         "format": "bestaudio/best",
-        "outtmpl": output_base,
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": quality,
-            }
-        ],
         "noplaylist": True,
         "noprogress": True,
         # android_vr bypasses YouTube's bot-check without needing cookies or a PO Token.
@@ -108,9 +127,6 @@ def _ydl_download_opts(output_base: str, quality: str, sleep_sec: int, max_retri
                 "skip": ["hls", "dash"],
             }
         },
-        "sleep_interval": sleep_sec,
-        "max_sleep_interval": sleep_sec + 5,
-        "sleep_interval_requests": 1,
         "retries": max_retries,
         "retry_sleep_functions": {
             "http": lambda n: min(10 * (2 ** (n - 1)), 120),
@@ -119,6 +135,117 @@ def _ydl_download_opts(output_base: str, quality: str, sleep_sec: int, max_retri
     }
 
 
+# ---------------------------------------------------------------------------
+# Long-lived YoutubeDL instances
+#
+# Building a YoutubeDL loads every extractor, the cookie jar and a fresh HTTP
+# session, so each worker thread keeps one instance per kind (search/download)
+# and only rebuilds it when its settings or cookies.txt change.
+# ---------------------------------------------------------------------------
+
+_ydl_lock = threading.Lock()
+_ydl_instances: dict[tuple[int, str], tuple[tuple, yt_dlp.YoutubeDL]] = {}
+_ydl_stats = {"builds": 0, "reuses": 0, "build_seconds": 0.0}
+_cookie_sig: Optional[tuple[int, int]] = None
+_cookie_generation = 0
+
+
+def _cookie_file_sig() -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(_COOKIES_PATH)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _cookies_generation() -> int:
+    """Bumped whenever cookies.txt is changed by something other than our own instances."""
+    global _cookie_sig, _cookie_generation
+    sig = _cookie_file_sig()
+    with _ydl_lock:
+        if sig != _cookie_sig:
+            _cookie_sig = sig
+            _cookie_generation += 1
+        return _cookie_generation
+
+
+def _close_ydl(ydl: yt_dlp.YoutubeDL) -> None:
+    """Close an instance; it writes the cookie jar, which must not count as an external change."""
+    global _cookie_sig
+    with _ydl_lock:
+        try:
+            ydl.close()
+        except Exception as exc:
+            print(f"[downloader] Closing YoutubeDL failed: {exc}", flush=True)
+        _cookie_sig = _cookie_file_sig()
+
+
+def _pooled_ydl(kind: str, settings_key: tuple, opts_factory) -> yt_dlp.YoutubeDL:
+    """Return this thread's *kind* instance, rebuilding it if settings or cookies changed."""
+    slot = (threading.get_ident(), kind)
+    key = (settings_key, _cookies_generation())
+    with _ydl_lock:
+        current = _ydl_instances.get(slot)
+        if current and current[0] == key:
+            _ydl_stats["reuses"] += 1
+            return current[1]
+        _ydl_instances.pop(slot, None)
+
+    if current:
+        _close_ydl(current[1])
+
+    started = time.perf_counter()
+    ydl = yt_dlp.YoutubeDL(opts_factory())
+    elapsed = time.perf_counter() - started
+
+    with _ydl_lock:
+        _ydl_instances[slot] = (key, ydl)
+        _ydl_stats["builds"] += 1
+        _ydl_stats["build_seconds"] += elapsed
+    print(f"[downloader] Built {kind} YoutubeDL in {elapsed * 1000:.0f} ms", flush=True)
+    return ydl
+
+
+def _discard_ydl(kind: str) -> None:
+    """Drop this thread's instance after an error so the next call starts clean."""
+    with _ydl_lock:
+        current = _ydl_instances.pop((threading.get_ident(), kind), None)
+    if current:
+        _close_ydl(current[1])
+
+
+def close_ydl_instances() -> None:
+    with _ydl_lock:
+        instances = [ydl for _, ydl in _ydl_instances.values()]
+        _ydl_instances.clear()
+    for ydl in instances:
+        _close_ydl(ydl)
+
+
+def close_thread_ydl_instances() -> None:
+    """Close the calling thread's instances, e.g. when a surplus pipeline worker exits."""
+    ident = threading.get_ident()
+    with _ydl_lock:
+        instances = [_ydl_instances.pop(slot)[1] for slot in list(_ydl_instances) if slot[0] == ident]
+    for ydl in instances:
+        _close_ydl(ydl)
+
+
+def get_ydl_stats() -> dict:
+    """Setup time saved by reuse, estimated from the average cost of a build."""
+    with _ydl_lock:
+        builds = _ydl_stats["builds"]
+        reuses = _ydl_stats["reuses"]
+        build_seconds = _ydl_stats["build_seconds"]
+    avg_ms = build_seconds * 1000 / builds if builds else 0.0
+    return {
+        "builds": builds,
+        "reuses": reuses,
+        "avg_build_ms": round(avg_ms, 1),
+        "saved_ms": round(avg_ms * reuses),
+    }
+
+
 # ---------------------------------------------------------------------------
 # Token-based result scoring
 # ---------------------------------------------------------------------------
@@ -131,18 +258,56 @@ def _tokenize(text: str) -> set[str]:
     return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 1 and w not in _STOPWORDS}
 
 
-def _score_entry(entry: dict, required: set[str]) -> float:
+# Durations within this many seconds count as the same recording; beyond
+# _DURATION_MAX_DIFF_SEC the candidate is almost certainly a different cut
+# (live version, extended mix, music video with an intro).
+_DURATION_MATCH_SEC = 3
+_DURATION_MAX_DIFF_SEC = 30
+_DURATION_WEIGHT = 0.3
+# For a perfect title match the length only ranks candidates against each
+# other: a music video with a long intro is still a far better pick than
+# falling back to a looser query.
+_DURATION_TIEBREAK_WEIGHT = 0.1
+
+
+def _duration_score(entry: dict, duration_sec: Optional[float]) -> Optional[float]:
+    """1.0 for a matching length, falling linearly to 0.0; None if either side is unknown."""
+    entry_duration = entry.get("duration")
+    if not duration_sec or not entry_duration:
+        return None
+    diff = abs(float(entry_duration) - duration_sec)
+    if diff <= _DURATION_MATCH_SEC:
+        return 1.0
+    if diff >= _DURATION_MAX_DIFF_SEC:
+        return 0.0
+    return 1.0 - (diff - _DURATION_MATCH_SEC) / (_DURATION_MAX_DIFF_SEC - _DURATION_MATCH_SEC)
+
+
+def _score_entry(entry: dict, required: set[str], duration_sec: Optional[float] = None) -> float:
     """
     Return what fraction of required tokens appear somewhere across
     video title + channel/uploader name.  1.0 = perfect match.
+
+    When the Spotify duration is known it is blended in: an exact length
+    lets a partial title match through. A perfect title match is never
+    pushed below the acceptance bar by its length; it only loses out to
+    another perfect match that is closer in length.
     """
     if not required:
-        return 1.0
-    video_title = entry.get("title") or ""
-    channel = entry.get("channel") or entry.get("uploader") or ""
-    haystack = _tokenize(f"{video_title} {channel}")
-    matched = required & haystack
-    return len(matched) / len(required)
+        token_score = 1.0
+    else:
+        video_title = entry.get("title") or ""
+        channel = entry.get("channel") or entry.get("uploader") or ""
+        haystack = _tokenize(f"{video_title} {channel}")
+        matched = required & haystack
+        token_score = len(matched) / len(required)
+
+    duration_score = _duration_score(entry, duration_sec)
+    if duration_score is None:
+        return token_score
+    if token_score == 1.0:
+        return 1.0 - _DURATION_TIEBREAK_WEIGHT * (1 - duration_score)
+    return (1 - _DURATION_WEIGHT) * token_score + _DURATION_WEIGHT * duration_score
 
 
 def _entry_url(entry: dict) -> Optional[str]:
@@ -151,25 +316,66 @@ def _entry_url(entry: dict) -> Optional[str]:
     )
 
 
-def search_youtube(query: str, required_tokens: Optional[set[str]] = None) -> Optional[str]:
+# Per-thread "a search request failed" flag. Searches run with ignoreerrors and
+# swallow exceptions, so without it an outage would look like "no results".
+_search_state = threading.local()
+
+
+def take_search_failed() -> bool:
+    """Whether a search in the calling thread failed since it last asked; resets the flag."""
+    failed = getattr(_search_state, "failed", False)
+    _search_state.failed = False
+    return failed
+
+
+def _search_candidates(query: str, n: int = 5) -> list[dict]:
+    """Flat yt-dlp search results for *query*, served from the search cache when possible."""
+    started = time.perf_counter()
+    cached = search_cache.lookup(query)
+    if cached is not None:
+        metrics.SEARCH_SECONDS.labels("cache").observe(time.perf_counter() - started)
+        print(f"[search] Cache hit for query: {query}", flush=True)
+        return cached
+
+    ydl = _pooled_ydl("search", (), _ydl_search_opts)
+    ratelimit.acquire()
+    started = time.perf_counter()
+    try:
+        info = ydl.extract_info(f"ytsearch{n}:{query}", download=False)
+    except Exception:
+        _discard_ydl("search")
+        raise
+    finally:
+        metrics.SEARCH_SECONDS.labels("youtube").observe(time.perf_counter() - started)
+    if info is None:
+        _search_state.failed = True
+        return []  # extraction error (ignoreerrors) — don't cache it
+    ratelimit.record_success()
+
+    entries = [e for e in info.get("entries") or [] if e]
+    # Empty results are cached too, so a hopeless query isn't repeated on every retry
+    search_cache.store(query, entries)
+    return entries
+
+
+def search_youtube(
+    query: str,
+    required_tokens: Optional[set[str]] = None,
+    duration_sec: Optional[float] = None,
+) -> Optional[str]:
     """
     Search YouTube and return the best-matching URL.
 
     Fetches up to 5 candidates and scores each by how many of the
     *required_tokens* (artist + title words) appear in the combined
-    video title + channel name.  Falls back to the top result if nothing
-    reaches a perfect score.
+    video title + channel name, and by how close its length is to
+    *duration_sec*.  Falls back to the top result if nothing reaches a
+    perfect score.
     """
-    n = 5
     try:
-        with yt_dlp.YoutubeDL(_ydl_search_opts()) as ydl:
-            info = ydl.extract_info(f"ytsearch{n}:{query}", download=False)
-        if not info or not info.get("entries"):
-            print(f"[search] No entries returned for query: {query}", flush=True)
-            return None
-
-        entries = [e for e in info["entries"] if e]
+        entries = _search_candidates(query)
         if not entries:
+            print(f"[search] No entries returned for query: {query}", flush=True)
             return None
 
         if not required_tokens:
@@ -177,14 +383,17 @@ def search_youtube(query: str, required_tokens: Optional[set[str]] = None) -> Op
             return _entry_url(entries[0])
 
         # Score all candidates; pick the best
-        scored = [(e, _score_entry(e, required_tokens)) for e in entries]
+        scored = [(e, _score_entry(e, required_tokens, duration_sec)) for e in entries]
         scored.sort(key=lambda x: x[1], reverse=True)
         best_entry, best_score = scored[0]
 
         # Log what we found for debugging
         for e, s in scored[:3]:
             ch = e.get("channel") or e.get("uploader") or "?"
-            print(f"[search]   score={s:.2f} channel={ch!r} title={e.get('title')!r}", flush=True)
+            print(
+                f"[search]   score={s:.2f} duration={e.get('duration')} channel={ch!r} title={e.get('title')!r}",
+                flush=True,
+            )
 
         # Accept if all required tokens matched; otherwise still use the top result
         # (the fallback chain in _search_with_fallbacks will try simpler queries next)
@@ -199,16 +408,18 @@ def search_youtube(query: str, required_tokens: Optional[set[str]] = None) -> Op
             return None
 
     except Exception as exc:
+        _search_state.failed = True
         print(f"[search] Exception for query '{query}': {exc}", flush=True)
         return None
 
 
-def _search_with_fallbacks(title: str, artist: str) -> Optional[str]:
+def _search_with_fallbacks(title: str, artist: str, duration_ms: Optional[int] = None) -> Optional[str]:
     """
-    Try progressively simpler search queries, using token scoring to pick
-    the best result from each batch of candidates.
+    Try progressively simpler search queries, using token and duration
+    scoring to pick the best result from each batch of candidates.
     """
     required = _tokenize(f"{artist} {title}")
+    duration_sec = duration_ms / 1000 if duration_ms else None
 
     queries = []
     if artist:
@@ -217,36 +428,35 @@ def _search_with_fallbacks(title: str, artist: str) -> Optional[str]:
     else:
         queries.append(title)
 
-    for i, q in enumerate(queries):
+    for attempt, q in enumerate(queries, start=1):
         print(f"[search] Trying query: {q!r} (required tokens: {required})", flush=True)
-        url = search_youtube(q, required_tokens=required)
+        url = search_youtube(q, required_tokens=required, duration_sec=duration_sec)
         if url:
+            metrics.SEARCH_ATTEMPTS.labels("found").observe(attempt)
             return url
-        if i < len(queries) - 1:
-            time.sleep(random.uniform(2.0, 4.0))
 
     # Last resort: relaxed search with only title tokens, no score filter
     if artist:
         print(f"[search] Falling back to title-only search: {title!r}", flush=True)
-        url = search_youtube(title, required_tokens=_tokenize(title))
+        url = search_youtube(title, required_tokens=_tokenize(title), duration_sec=duration_sec)
         if url:
+            metrics.SEARCH_ATTEMPTS.labels("found").observe(len(queries) + 1)
             return url
 
+    metrics.SEARCH_ATTEMPTS.labels("not_found").observe(len(queries) + bool(artist))
     return None
 
 
 # ---------------------------------------------------------------------------
-# MP3 metadata
+# Tagging
 # ---------------------------------------------------------------------------
 def _set_metadata(path: str, title: str, artist: Optional[str], album: Optional[str]) -> None:
-    """Write ID3 tags using EasyID3 (single pass, no redundant double-write)."""
+    """Write title/artist/album via mutagen's easy interface (ID3, MP4 atoms or Vorbis comments)."""
     try:
-        try:
-            audio = EasyID3(path)
-        except ID3NoHeaderError:
-            audio = mutagen.File(path, easy=True)
-            if audio is None:
-                return
+        audio = mutagen.File(path, easy=True)
+        if audio is None:
+            return
+        if audio.tags is None:
             audio.add_tags()
         audio["title"] = title
         if artist:
@@ -259,87 +469,157 @@ def _set_metadata(path: str, title: str, artist: Optional[str], album: Optional[
 
 
 # ---------------------------------------------------------------------------
-# Core download
+# Output format
+#
+# Settings.output_format "mp3" re-encodes everything that isn't MP3 already.
+# "native" keeps YouTube's stream: M4A (AAC) is stored as downloaded and Opus
+# is stream-copied from its WebM container into an .opus file, so neither is
+# decoded or re-encoded. Anything else still falls back to MP3.
 # ---------------------------------------------------------------------------
 
-def download_track(
+OUTPUT_FORMATS = ("mp3", "native")
+OUTPUT_EXTENSIONS = (".mp3", ".opus", ".m4a")
+_NATIVE_EXTENSIONS = (".m4a", ".opus")
+
+
+# ---------------------------------------------------------------------------
+# Download stages
+# ---------------------------------------------------------------------------
+
+_TEMP_EXTS = (".mp3", ".webm", ".m4a", ".opus", ".part")
+
+
+def plan_track(
     *,
     title: str,
     artist: Optional[str],
     album: Optional[str],
     output_dir: str,
-    quality: str = "320",
-    template: str = "{artist} - {title}",
-    sleep_sec: int = 7,
-    max_retries: int = 3,
-    log_fn=None,
-) -> tuple[bool, Optional[str], Optional[str]]:
+    template: str,
+) -> tuple[Optional[str], Optional[str]]:
     """
-    Download a single track.
+    Work out where a track will be stored.
 
-    Returns (success, file_path, error_message).
+    Returns (final_path, error_message).
     """
-
-    def _log(msg: str) -> None:
-        if log_fn:
-            log_fn(msg)
-
     os.makedirs(output_dir, exist_ok=True)
-
     file_name = sanitize_filename(template, title or "", artist or "", album or "")
     if not file_name:
-        return False, None, "Empty filename after sanitization"
+        return None, "Empty filename after sanitization"
+    return os.path.join(output_dir, f"{file_name}.mp3"), None
+
+
+def find_output(final_path: str) -> Optional[str]:
+    """The stored file for *final_path* in whichever output format it was saved."""
+    stem = os.path.splitext(final_path)[0]
+    return next((stem + ext for ext in OUTPUT_EXTENSIONS if os.path.exists(stem + ext)), None)
+
+
+def _temp_base(final_path: str) -> str:
+    directory, name = os.path.split(final_path)
+    return os.path.join(directory, f"_tmp_{os.path.splitext(name)[0]}")
 
-    final_path = os.path.join(output_dir, f"{file_name}.mp3")
-    if os.path.exists(final_path):
-        _log(f"Already exists: {file_name}")
-        return False, final_path, None  # skipped – file already present
 
-    # Find the YouTube URL
-    youtube_url = _search_with_fallbacks(title or "", artist or "")
-    if not youtube_url:
-        search_label = f"{artist} - {title}" if artist else title
-        return False, None, f"No YouTube result found for: {search_label}"
+def _remove_temp_files(base: str) -> None:
+    for ext in _TEMP_EXTS:
+        p = base + ext
+        if os.path.exists(p):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
 
-    # Build a temp path using os.splitext to avoid the .mp3-in-path bug
-    base_temp = os.path.join(output_dir, f"_tmp_{file_name}")
-    base_no_ext, _ = os.path.splitext(base_temp + ".mp3")  # strips nothing, but future-proof
 
-    ydl_opts = _ydl_download_opts(base_no_ext, quality, sleep_sec, max_retries)
+def fetch_audio(
+    youtube_url: str,
+    final_path: str,
+    max_retries: int = 3,
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Download the best audio stream next to *final_path* without transcoding.
+
+    Returns (downloaded_path, error_message).
+    """
+    base = _temp_base(final_path)
+    ydl = _pooled_ydl(
+        "download",
+        (max_retries,),
+        lambda: _ydl_download_opts(max_retries),
+    )
+    ydl.params["outtmpl"]["default"] = f"{base}.%(ext)s"
 
+    ratelimit.acquire()
+    started = time.perf_counter()
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([youtube_url])
+        info = ydl.extract_info(youtube_url, download=True)
     except Exception as exc:
-        # Clean up any partial temp files
-        for ext in (".mp3", ".webm", ".m4a", ".opus", ".part"):
-            p = base_no_ext + ext
-            if os.path.exists(p):
-                try:
-                    os.remove(p)
-                except OSError:
-                    pass
-        return False, None, str(exc)
-
-    # Locate the downloaded file (yt-dlp appends its own extension)
-    downloaded = None
-    for ext in (".mp3", ".webm", ".m4a", ".opus"):
-        candidate = base_no_ext + ext
-        if os.path.exists(candidate):
-            downloaded = candidate
-            break
-
+        metrics.DOWNLOAD_SECONDS.labels("error").observe(time.perf_counter() - started)
+        _discard_ydl("download")
+        _remove_temp_files(base)
+        return None, str(exc)
+    metrics.DOWNLOAD_SECONDS.labels("ok").observe(time.perf_counter() - started)
+    ratelimit.record_success()
+
+    downloads = (info or {}).get("requested_downloads") or []
+    downloaded = downloads[0].get("filepath") if downloads else None
+    if not downloaded or not os.path.exists(downloaded):
+        # Locate the downloaded file (yt-dlp appends its own extension)
+        downloaded = next(
+            (base + ext for ext in _TEMP_EXTS[:-1] if os.path.exists(base + ext)),
+            None,
+        )
     if not downloaded:
-        return False, None, "Downloaded file not found after yt-dlp run"
+        return None, "Downloaded file not found after yt-dlp run"
+    metrics.DOWNLOADED_BYTES.inc(os.path.getsize(downloaded))
+    return downloaded, None
 
-    # Ensure it ends up as .mp3
-    if not downloaded.endswith(".mp3"):
-        mp3_temp = base_no_ext + ".mp3"
-        os.rename(downloaded, mp3_temp)
-        downloaded = mp3_temp
 
-    _set_metadata(downloaded, title or "", artist, album)
+def finalize_audio(
+    downloaded: str,
+    final_path: str,
+    *,
+    quality: str,
+    title: str,
+    artist: Optional[str],
+    album: Optional[str],
+    output_format: str = "mp3",
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Bring a fetched file into the configured output format, tag it and move it into place.
 
-    os.rename(downloaded, final_path)
-    _log(f"Downloaded: {file_name}")
-    return True, final_path, None
+    The extension of *final_path* is replaced by that of the stored format.
+    Returns (stored_path, error_message).
+    """
+    base = _temp_base(final_path)
+    ext = os.path.splitext(downloaded)[1].lower()
+    started = time.perf_counter()
+    try:
+        temp = None
+        if ext == ".mp3" or (output_format == "native" and ext in _NATIVE_EXTENSIONS):
+            temp = downloaded
+        elif output_format == "native" and ext == ".webm":
+            opus = base + ".opus"
+            try:
+                remux_audio(downloaded, opus)
+                # ffmpeg puts Vorbis into an .opus file just as well; only real Opus is kept
+                if isinstance(mutagen.File(opus), OggOpus):
+                    temp = opus
+            except RuntimeError:
+                pass
+            if temp is None and os.path.exists(opus):
+                os.remove(opus)  # transcoded to MP3 below
+        if temp is None:
+            temp = base + ".mp3"
+            convert_to_mp3(downloaded, temp, quality)
+        if temp != downloaded:
+            os.remove(downloaded)
+
+        stored = os.path.splitext(final_path)[0] + os.path.splitext(temp)[1]
+        _set_metadata(temp, title or "", artist, album)
+        os.rename(temp, stored)
+    except Exception as exc:
+        metrics.TRANSCODE_SECONDS.labels("error").observe(time.perf_counter() - started)
+        _remove_temp_files(base)
+        return None, str(exc)
+    metrics.TRANSCODE_SECONDS.labels(os.path.splitext(stored)[1].lstrip(".")).observe(time.perf_counter() - started)
+    return stored, None
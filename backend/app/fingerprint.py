@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session, col, func, select
+
+from .database import Fingerprint, FingerprintKey, LibraryFile, engine, get_settings
+from .library import OUTPUT_DIR
+
+# ---------------------------------------------------------------------------
+# Acoustic fingerprint dedup
+#
+# Title/artist keys miss duplicates such as "Song (Remastered 2011)" vs
+# "Song". With Settings.fingerprint_dedup on, every new file is fingerprinted
+# with Chromaprint's fpcalc and compared against library files of a similar
+# length. Fingerprints are cached by a hash of the file contents, so each file
+# is decoded once no matter how often it is checked or moved.
+#
+# Candidates come from an inverted index rather than a scan: a content-defined
+# sample of each fingerprint's frame values (low bits dropped) is stored in
+# FingerprintKey, and only files sharing several of those keys with the new
+# file are compared bit by bit — in the process pool, off the pipeline thread.
+# ---------------------------------------------------------------------------
+
+FPCALC = os.environ.get("FPCALC_PATH", "fpcalc")
+
+_MATCH_THRESHOLD = 0.85  # share of identical fingerprint bits; unrelated songs land around 0.5
+_DURATION_TOLERANCE_SEC = 5
+_MAX_OFFSET = 12  # frames (~1.5s) of alignment slack between two fingerprints
+_MIN_OVERLAP = 50  # frames
+_HASH_CHUNK = 1024 * 1024
+_KEY_SHIFT = 4  # drop the least stable bits of each frame
+_KEY_SAMPLE = 8  # keep keys divisible by this — the same subset in every file, whatever the alignment
+_MIN_KEY_HITS = 3
+_MAX_CANDIDATES = 20
+_BACKFILL_BATCH = 200
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Paths the backfill already handled without adding a row (byte-identical copies, fpcalc errors)
+_backfill_done: set[str] = set()
+
+
+def _log(msg: str) -> None:
+    print(f"[fingerprint] {msg}", flush=True)
+
+
+def available() -> bool:
+    return shutil.which(FPCALC) is not None
+
+
+def enabled() -> bool:
+    with Session(engine) as session:
+        return get_settings(session).fingerprint_dedup and available()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Hashing and decoding are CPU-bound; keep half the cores for downloads and transcodes."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, (os.cpu_count() or 2) // 2),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+# ---------------------------------------------------------------------------
+# Worker-process functions
+# ---------------------------------------------------------------------------
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _run_fpcalc(path: str) -> tuple[int, bytes]:
+    """Decode *path* with fpcalc and return (duration_sec, packed raw fingerprint)."""
+    result = subprocess.run(
+        [FPCALC, "-raw", "-json", path],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-300:] or f"fpcalc exited with {result.returncode}")
+    data = json.loads(result.stdout)
+    frames = array("I", (v & 0xFFFFFFFF for v in data["fingerprint"]))
+    return int(round(data["duration"])), frames.tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Matching
+# ---------------------------------------------------------------------------
+
+def _frames(blob: bytes) -> array:
+    frames = array("I")
+    frames.frombytes(blob)
+    return frames
+
+
+def similarity(a: array, b: array) -> float:
+    """Best share of matching bits over a small range of alignments."""
+    best = 0.0
+    for offset in range(-_MAX_OFFSET, _MAX_OFFSET + 1):
+        x, y = (a[offset:], b) if offset >= 0 else (a, b[-offset:])
+        n = min(len(x), len(y))
+        if n < _MIN_OVERLAP:
+            continue
+        errors = sum((p ^ q).bit_count() for p, q in zip(x, y))
+        best = max(best, 1 - errors / (32 * n))
+    return best
+
+
+def fingerprint_keys(blob: bytes) -> set[int]:
+    keys = {frame >> _KEY_SHIFT for frame in _frames(blob)}
+    return {key for key in keys if key % _KEY_SAMPLE == 0}
+
+
+def _best_match(blob: bytes, candidates: list[bytes]) -> Optional[int]:
+    """Index of the first candidate that is the same recording. Runs in a worker process."""
+    frames = _frames(blob)
+    for i, other in enumerate(candidates):
+        if similarity(frames, _frames(other)) >= _MATCH_THRESHOLD:
+            return i
+    return None
+
+
+def _store(session: Session, file_hash: str, path: str, duration: int, blob: bytes) -> None:
+    session.merge(Fingerprint(file_hash=file_hash, path=path, duration=duration, fingerprint=blob))
+    keys = [{"key": key, "file_hash": file_hash} for key in fingerprint_keys(blob)]
+    if keys:
+        session.exec(insert(FingerprintKey).prefix_with("OR IGNORE"), params=keys)
+
+
+def _find_match(session: Session, file_hash: str, path: str, duration: int, blob: bytes) -> Optional[str]:
+    keys = fingerprint_keys(blob)
+    if not keys:
+        return None
+    hits = func.count(FingerprintKey.key)
+    candidates = session.exec(
+        select(Fingerprint.path, Fingerprint.fingerprint)
+        .join(FingerprintKey, FingerprintKey.file_hash == Fingerprint.file_hash)
+        .where(
+            col(FingerprintKey.key).in_(keys),
+            Fingerprint.duration.between(duration - _DURATION_TOLERANCE_SEC, duration + _DURATION_TOLERANCE_SEC),
+            Fingerprint.file_hash != file_hash,
+            Fingerprint.path != path,
+        )
+        .group_by(Fingerprint.file_hash)
+        .having(hits >= _MIN_KEY_HITS)
+        .order_by(hits.desc())
+        .limit(_MAX_CANDIDATES)
+    ).all()
+    candidates = [(p, fp) for p, fp in candidates if os.path.exists(p)]
+    if not candidates:
+        return None
+    index = _get_pool().submit(_best_match, blob, [fp for _, fp in candidates]).result()
+    return candidates[index][0] if index is not None else None
+
+
+def check_file(path: str) -> Optional[str]:
+    """
+    Fingerprint *path* and return the library file holding the same recording, if any.
+
+    Unique files are added to the fingerprint table; duplicates are not, since
+    the caller will usually delete them. Returns None on fingerprinting errors.
+    """
+    pool = _get_pool()
+    try:
+        file_hash = pool.submit(_hash_file, path).result()
+        with Session(engine) as session:
+            cached = session.get(Fingerprint, file_hash)
+            if cached is not None and cached.path != path and os.path.exists(cached.path):
+                return cached.path  # byte-identical copy
+
+            if cached is not None:
+                duration, blob = cached.duration, cached.fingerprint
+            else:
+                duration, blob = pool.submit(_run_fpcalc, path).result()
+
+            duplicate = _find_match(session, file_hash, path, duration, blob)
+            if duplicate is None:
+                _store(session, file_hash, path, duration, blob)
+                session.commit()
+            return duplicate
+    except Exception as exc:
+        _log(f"Could not fingerprint {os.path.basename(path)}: {exc}")
+        return None
+
+
+def backfill_library() -> None:
+    """Fingerprint indexed library files that have no fingerprint yet, a batch per run."""
+    if not enabled():
+        return
+
+    with Session(engine) as session:
+        known = set(session.exec(select(Fingerprint.path)).all())
+        paths = [
+            os.path.join(OUTPUT_DIR, rel)
+            for rel in session.exec(select(LibraryFile.path).order_by(col(LibraryFile.scanned_at).desc())).all()
+        ]
+    todo = [p for p in paths if p not in known and p not in _backfill_done][:_BACKFILL_BATCH]
+    if not todo:
+        return
+    _backfill_done.update(todo)
+
+    pool = _get_pool()
+    hashed = []
+    for path, future in [(p, pool.submit(_hash_file, p)) for p in todo]:
+        try:
+            hashed.append((path, future.result()))
+        except OSError:
+            continue  # deleted since the last library scan
+
+    with Session(engine) as session:
+        hashes = [h for _, h in hashed]
+        cached = {
+            row.file_hash: row
+            for row in session.exec(select(Fingerprint).where(col(Fingerprint.file_hash).in_(hashes))).all()
+        }
+        for path, file_hash in hashed:
+            row = cached.get(file_hash)
+            if row is not None and not os.path.exists(row.path):
+                row.path = path  # the file was moved or renamed
+                session.add(row)
+        session.commit()
+    # One fpcalc run per distinct content; byte-identical copies share a row
+    pending = {h: p for p, h in reversed(hashed) if h not in cached}
+
+    added = 0
+    futures = [(p, h, pool.submit(_run_fpcalc, p)) for h, p in pending.items()]
+    with Session(engine) as session:
+        for path, file_hash, future in futures:
+            try:
+                duration, blob = future.result()
+            except Exception as exc:
+                _log(f"Could not fingerprint {os.path.basename(path)}: {exc}")
+                continue
+            _store(session, file_hash, path, duration, blob)
+            added += 1
+        session.commit()
+    _log(f"Fingerprinted {added} library files")
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+# ---------------------------------------------------------------------------
+# In-process background jobs
+#
+# Long-running request work (imports, uploads, playlist fetches) runs in a
+# thread; the request returns a job id that clients poll via /api/jobs/{id}.
+# Jobs only live in memory — they are progress reports, not a work queue.
+# ---------------------------------------------------------------------------
+
+_MAX_FINISHED = 200  # finished jobs kept for polling before the oldest are dropped
+
+
+@dataclass
+class BackgroundJob:
+    id: str
+    kind: str
+    # running | done | failed
+    status: str = "running"
+    # 0.0 – 1.0 when the total amount of work is known, otherwise None
+    progress: Optional[float] = None
+    processed: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+
+_lock = threading.Lock()
+_jobs: dict[str, BackgroundJob] = {}
+
+
+def _prune() -> None:
+    finished = sorted(
+        (j for j in _jobs.values() if j.finished_at is not None),
+        key=lambda j: j.finished_at,
+    )
+    for job in finished[: max(0, len(finished) - _MAX_FINISHED)]:
+        del _jobs[job.id]
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _lock:
+        job = _jobs.get(job_id)
+        return asdict(job) if job else None
+
+
+def update_job(job_id: str, **fields: Any) -> None:
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+
+def start_job(kind: str, fn: Callable[..., dict], *args: Any, executor: Optional[Executor] = None) -> BackgroundJob:
+    """
+    Run ``fn(job_id, *args)`` in a daemon thread, or on *executor* to bound concurrency.
+
+    The function's return value becomes the job result; an exception marks
+    the job as failed with its message.
+    """
+    job = BackgroundJob(id=uuid.uuid4().hex, kind=kind)
+    with _lock:
+        _prune()
+        _jobs[job.id] = job
+
+    def runner() -> None:
+        try:
+            result = fn(job.id, *args)
+        except Exception as exc:
+            print(f"[jobs] {kind} {job.id} failed: {exc}", flush=True)
+            update_job(job.id, status="failed", error=str(exc), finished_at=datetime.now(timezone.utc))
+        else:
+            update_job(
+                job.id,
+                status="done",
+                progress=1.0,
+                result=result,
+                finished_at=datetime.now(timezone.utc),
+            )
+
+    if executor is not None:
+        executor.submit(runner)
+    else:
+        threading.Thread(target=runner, name=f"job-{kind}", daemon=True).start()
+    return job
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from typing import Iterator, Optional
+
+import mutagen
+from sqlalchemy import insert
+from sqlmodel import Session, col, delete, select
+
+from .database import LibraryFile, engine, make_dedup_key, write_lock
+
+# ---------------------------------------------------------------------------
+# Library index
+#
+# Mirrors the audio files under OUTPUT_DIR into the LibraryFile table so that
+# "do we already have this song?" is an indexed lookup on dedup_key instead of
+# a guess at the file name. Rescans only re-read tags for files whose size or
+# mtime changed, which keeps an unchanged library down to a directory walk.
+# ---------------------------------------------------------------------------
+
+OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "/music")
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".flac", ".m4a", ".ogg", ".wma", ".aac", ".opus", ".webm"}
+# yt-dlp downloads into "_tmp_<name>.<ext>" next to the final file (see downloader._temp_base)
+_TEMP_PREFIX = "_tmp_"
+
+_BATCH_SIZE = 500
+
+_last_scan: Optional[dict] = None
+
+
+def _log(msg: str) -> None:
+    print(f"[library] {msg}", flush=True)
+
+
+def read_tags(path: str, fallback_name: Optional[str] = None) -> tuple[str, Optional[str], Optional[str]]:
+    """Title/artist/album from the file's tags, falling back to an "Artist - Title" file name."""
+    title = artist = album = None
+    try:
+        audio = mutagen.File(path, easy=True)
+        if audio is not None and audio.tags is not None:
+            title = (audio.tags.get("title") or [None])[0]
+            artist = (audio.tags.get("artist") or [None])[0]
+            album = (audio.tags.get("album") or [None])[0]
+    except Exception:
+        pass  # Unreadable tags are not fatal — use the file name
+
+    if not title:
+        stem = os.path.splitext(os.path.basename(fallback_name or path))[0]
+        if " - " in stem and not artist:
+            artist, title = (part.strip() for part in stem.split(" - ", 1))
+        else:
+            title = stem.strip()
+    return title, artist, album
+
+
+def is_library_file(name: str) -> bool:
+    base = os.path.basename(name)
+    return os.path.splitext(base)[1].lower() in AUDIO_EXTENSIONS and not base.startswith(_TEMP_PREFIX)
+
+
+def _walk(root: str) -> Iterator[os.DirEntry]:
+    """Yield every audio file below *root* without following symlinked directories."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif is_library_file(entry.name):
+                        yield entry
+        except OSError as exc:
+            _log(f"Cannot read directory: {exc}")
+
+
+def _row(path: str, size: int, mtime: float) -> dict:
+    title, artist, album = read_tags(path)
+    return {
+        "path": os.path.relpath(path, OUTPUT_DIR),
+        "size": size,
+        "mtime": mtime,
+        "title": title,
+        "artist": artist,
+        "album": album,
+        "dedup_key": make_dedup_key(artist, title),
+        "scanned_at": datetime.utcnow(),
+    }
+
+
+def _upsert(session: Session, rows: list[dict]) -> None:
+    with write_lock:
+        session.exec(insert(LibraryFile).prefix_with("OR REPLACE"), params=rows)
+        session.commit()
+
+
+def _known_stats(paths: list[str]) -> dict[str, tuple[int, float]]:
+    rels = [os.path.relpath(p, OUTPUT_DIR) for p in paths]
+    known = {}
+    with Session(engine) as session:
+        for i in range(0, len(rels), _BATCH_SIZE):
+            for path, size, mtime in session.exec(
+                select(LibraryFile.path, LibraryFile.size, LibraryFile.mtime)
+                .where(col(LibraryFile.path).in_(rels[i : i + _BATCH_SIZE]))
+            ):
+                known[path] = (size, mtime)
+    return known
+
+
+def index_files(paths: list[str], *, skip_unchanged: bool = False) -> list[dict]:
+    """
+    Add or refresh the given files and return their index rows.
+
+    With *skip_unchanged*, files whose size and mtime match the index are not
+    opened and not returned, as in scan_library.
+    """
+    known = _known_stats(paths) if skip_unchanged else {}
+    rows = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            if known.get(os.path.relpath(path, OUTPUT_DIR)) == (st.st_size, st.st_mtime):
+                continue
+            rows.append(_row(path, st.st_size, st.st_mtime))
+        except FileNotFoundError:
+            continue  # removed again before we got to it
+        except Exception as exc:
+            _log(f"Could not index {path}: {exc}")
+    if rows:
+        with Session(engine) as session:
+            for i in range(0, len(rows), _BATCH_SIZE):
+                _upsert(session, rows[i : i + _BATCH_SIZE])
+    return rows
+
+
+def index_file(path: str) -> None:
+    """Add or refresh a single file, e.g. right after a download finished."""
+    index_files([path])
+
+
+def remove_paths(path: str) -> list[str]:
+    """Drop the index rows for *path* or, if it was a directory, everything below it."""
+    rel = os.path.relpath(path, OUTPUT_DIR)
+    match = (LibraryFile.path == rel) | col(LibraryFile.path).startswith(rel + os.sep, autoescape=True)
+    with write_lock, Session(engine) as session:
+        removed = session.exec(select(LibraryFile.path).where(match)).all()
+        if removed:
+            session.exec(delete(LibraryFile).where(match))
+            session.commit()
+    return [os.path.join(OUTPUT_DIR, p) for p in removed]
+
+
+def walk_files(root: str) -> list[str]:
+    return [entry.path for entry in _walk(root)]
+
+
+def scan_library() -> dict:
+    """
+    Bring the index in line with OUTPUT_DIR.
+
+    Files whose size and mtime match the index are not opened; new or changed
+    files get their tags re-read and rows for deleted files are dropped.
+    """
+    global _last_scan
+    started = time.monotonic()
+
+    with Session(engine) as session:
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in session.exec(select(LibraryFile.path, LibraryFile.size, LibraryFile.mtime))
+        }
+
+        seen: set[str] = set()
+        batch: list[dict] = []
+        files = updated = 0
+        for entry in _walk(OUTPUT_DIR):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            rel = os.path.relpath(entry.path, OUTPUT_DIR)
+            seen.add(rel)
+            files += 1
+            if known.get(rel) == (st.st_size, st.st_mtime):
+                continue
+
+            batch.append(_row(entry.path, st.st_size, st.st_mtime))
+            updated += 1
+            if len(batch) >= _BATCH_SIZE:
+                _upsert(session, batch)
+                batch = []
+        if batch:
+            _upsert(session, batch)
+
+        removed = [path for path in known if path not in seen]
+        for i in range(0, len(removed), _BATCH_SIZE):
+            with write_lock:
+                session.exec(delete(LibraryFile).where(col(LibraryFile.path).in_(removed[i : i + _BATCH_SIZE])))
+                session.commit()
+
+    _last_scan = {
+        "files": files,
+        "updated": updated,
+        "removed": len(removed),
+        "duration_sec": round(time.monotonic() - started, 2),
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    if updated or removed:
+        _log(f"Scan: {files} files, {updated} new/changed, {len(removed)} removed in {_last_scan['duration_sec']}s")
+    return _last_scan
+
+
+def get_stats() -> Optional[dict]:
+    return _last_scan
+
+
+# ---------------------------------------------------------------------------
+# Lookups used before queuing or searching
+# ---------------------------------------------------------------------------
+
+def find_existing(artist: Optional[str], title: Optional[str]) -> Optional[str]:
+    """Absolute path of an indexed file with the same artist/title, if it still exists."""
+    key = make_dedup_key(artist, title)
+    with Session(engine) as session:
+        paths = session.exec(select(LibraryFile.path).where(LibraryFile.dedup_key == key)).all()
+    for rel in paths:
+        path = os.path.join(OUTPUT_DIR, rel)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def key_paths() -> dict[str, str]:
+    """dedup_key -> absolute path for the whole library, for bulk checks like CSV imports."""
+    with Session(engine) as session:
+        rows = session.exec(select(LibraryFile.dedup_key, LibraryFile.path)).all()
+    return {key: os.path.join(OUTPUT_DIR, rel) for key, rel in rows if key}
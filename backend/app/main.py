@@ -6,7 +6,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .database import create_db_and_tables
-from .routers import auth, downloads, playlists, requests, settings, status, upload
+from .migrations import run_migrations
+from .routers import auth, downloads, jobs, metrics, playlists, requests, settings, status, upload
 from .routers import import_csv as import_csv_router
 from .scheduler import start_scheduler, stop_scheduler
 
@@ -14,6 +15,7 @@ from .scheduler import start_scheduler, stop_scheduler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    run_migrations()
     start_scheduler()
     yield
     stop_scheduler()
@@ -36,3 +38,6 @@ app.include_router(settings.router, prefix="/api")
 app.include_router(status.router, prefix="/api")
 app.include_router(import_csv_router.router, prefix="/api")
 app.include_router(upload.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+# Scraped by Prometheus on the backend port directly; not proxied by the frontend
+app.include_router(metrics.router)
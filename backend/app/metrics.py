@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# ---------------------------------------------------------------------------
+# Prometheus metrics
+#
+# Instruments are updated where the work happens; gauges that describe
+# current state (queue depths, rate limiter, breaker) are refreshed when
+# /metrics is scraped (see routers/metrics.py). Timings are split so a
+# slowdown can be attributed: YouTube (search/download), our own rate
+# limiter (rate_limit_wait), FFmpeg (transcode queue wait vs. run) or SQLite
+# (track claim).
+# ---------------------------------------------------------------------------
+
+SEARCH_SECONDS = Histogram(
+    "sonus_search_seconds",
+    "Latency of one YouTube search query",
+    ["source"],  # youtube | cache
+    buckets=(0.01, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+SEARCH_ATTEMPTS = Histogram(
+    "sonus_search_attempts_per_track",
+    "Search queries tried before a track was matched or given up on",
+    ["outcome"],  # found | not_found
+    buckets=(1, 2, 3, 4),
+)
+DOWNLOAD_SECONDS = Histogram(
+    "sonus_download_seconds",
+    "Time yt-dlp took to fetch one track's audio",
+    ["outcome"],  # ok | error
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320),
+)
+DOWNLOADED_BYTES = Counter("sonus_downloaded_bytes_total", "Bytes of audio fetched from YouTube")
+TRANSCODE_SECONDS = Histogram(
+    "sonus_transcode_seconds",
+    "Time to bring a fetched file into its output format, tag it and move it into place",
+    ["output"],  # mp3 | opus | m4a | error
+    buckets=(0.05, 0.25, 1, 2, 5, 10, 20, 40, 80),
+)
+FFMPEG_QUEUE_WAIT_SECONDS = Histogram(
+    "sonus_ffmpeg_queue_wait_seconds",
+    "Time an FFmpeg job waited for a transcode worker",
+    ["priority"],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+FFMPEG_RUN_SECONDS = Histogram(
+    "sonus_ffmpeg_run_seconds",
+    "Run time of one FFmpeg process",
+    ["priority"],
+    buckets=(0.05, 0.25, 1, 2, 5, 10, 20, 40, 80),
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "sonus_rate_limit_wait_seconds",
+    "Time a YouTube request waited for the shared rate limiter",
+    buckets=(0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300),
+)
+RATE_LIMIT_EVENTS = Counter("sonus_rate_limit_events_total", "Throttling responses (429 / bot check) from YouTube")
+CLAIM_SECONDS = Histogram(
+    "sonus_track_claim_seconds",
+    "Time to claim the next queued track in SQLite",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+STAGE_SECONDS = Histogram(
+    "sonus_pipeline_stage_seconds",
+    "Time a pipeline worker spent on one job, including hand-off waits",
+    ["stage"],  # resolve | fetch | transcode
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 20, 40, 80, 160, 320),
+)
+TRACKS_FINISHED = Counter(
+    "sonus_tracks_finished_total",
+    "Tracks leaving the pipeline",
+    ["status", "kind"],  # kind is the failure kind for failed/rescheduled tracks
+)
+
+# Refreshed on scrape
+TRACKS = Gauge("sonus_tracks", "Tracks per status", ["status"])
+PIPELINE_QUEUE = Gauge("sonus_pipeline_queue_depth", "Jobs waiting between pipeline stages", ["stage"])
+PIPELINE_IN_FLIGHT = Gauge("sonus_pipeline_in_flight", "Tracks currently in the download pipeline")
+PIPELINE_BREAKER_OPEN = Gauge("sonus_pipeline_breaker_open", "1 while the circuit breaker pauses new downloads")
+FFMPEG_QUEUED = Gauge("sonus_ffmpeg_queued", "FFmpeg jobs waiting for a worker", ["priority"])
+FFMPEG_RUNNING = Gauge("sonus_ffmpeg_running", "FFmpeg processes running")
+RATE_LIMIT_RATE = Gauge("sonus_rate_limit_requests_per_second", "Current YouTube request rate allowed by the limiter")
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from sqlalchemy import Connection, insert, literal
+from sqlmodel import Session, SQLModel, select, update
+
+from .database import (
+    Fingerprint,
+    FingerprintKey,
+    MonitoredPlaylist,
+    Settings,
+    Track,
+    engine,
+    make_dedup_key,
+    write_lock,
+)
+
+# ---------------------------------------------------------------------------
+# Schema migrations
+#
+# ``create_all`` only creates missing tables, so columns and indexes added to
+# existing tables need a migration. The schema version lives in SQLite's
+# PRAGMA user_version; every migration above it runs once at startup, in
+# order. Steps are written to be idempotent so a fresh database (already
+# created complete by create_all) passes through them as no-ops.
+#
+# Schema steps run in one transaction together with the version bump.
+# Backfills are marked ``batched``: they commit in small batches so a large
+# Track table is never locked for long, and are safe to resume if interrupted.
+# ---------------------------------------------------------------------------
+
+_BACKFILL_BATCH = 1000
+
+_MIGRATIONS: list[tuple[int, str, Callable, bool]] = []
+
+
+def migration(version: int, description: str, *, batched: bool = False):
+    def register(fn: Callable) -> Callable:
+        _MIGRATIONS.append((version, description, fn, batched))
+        return fn
+    return register
+
+
+def _log(msg: str) -> None:
+    print(f"[database] {msg}", flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _column_ddl(column) -> str:
+    ddl = f'"{column.name}" {column.type.compile(dialect=engine.dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        rendered = literal(default).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {rendered}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+
+def add_column(conn: Connection, model: type[SQLModel], name: str) -> None:
+    table = model.__table__
+    existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+    if name not in existing:
+        conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {_column_ddl(table.c[name])}')
+        _log(f"Added column {table.name}.{name}")
+
+
+def create_index(conn: Connection, model: type[SQLModel], name: str) -> None:
+    index = next(i for i in model.__table__.indexes if i.name == name)
+    index.create(conn, checkfirst=True)
+
+
+# ---------------------------------------------------------------------------
+# Migrations — append only; never renumber or edit one that has shipped
+# ---------------------------------------------------------------------------
+
+@migration(1, "track search and dedup columns")
+def _track_search_columns(conn: Connection) -> None:
+    for name in ("duration_ms", "isrc", "youtube_url", "dedup_key"):
+        add_column(conn, Track, name)
+    create_index(conn, Track, "ix_track_dedup_key")
+
+
+@migration(2, "pipeline concurrency settings and playlist snapshots")
+def _pipeline_settings(conn: Connection) -> None:
+    for name in ("search_workers", "download_workers", "transcode_workers"):
+        add_column(conn, Settings, name)
+    add_column(conn, MonitoredPlaylist, "snapshot_id")
+
+
+@migration(3, "backfill track dedup keys", batched=True)
+def _backfill_dedup_keys() -> None:
+    done = 0
+    while True:
+        with write_lock, Session(engine) as session:
+            rows = session.exec(
+                select(Track.id, Track.artist, Track.title).where(Track.dedup_key.is_(None)).limit(_BACKFILL_BATCH)
+            ).all()
+            if not rows:
+                break
+            session.exec(
+                update(Track),
+                params=[{"id": id_, "dedup_key": make_dedup_key(artist, title)} for id_, artist, title in rows],
+            )
+            session.commit()
+        done += len(rows)
+        if done % (_BACKFILL_BATCH * 50) == 0:
+            _log(f"Backfilled {done} dedup keys…")
+    if done:
+        _log(f"Backfilled {done} dedup keys")
+
+
+@migration(4, "fingerprint dedup setting")
+def _fingerprint_setting(conn: Connection) -> None:
+    add_column(conn, Settings, "fingerprint_dedup")
+
+
+_STATUS_COUNT_TRIGGERS = {
+    "track_status_count_insert": """
+        AFTER INSERT ON track BEGIN
+            INSERT INTO trackstatuscount (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END""",
+    "track_status_count_delete": """
+        AFTER DELETE ON track BEGIN
+            UPDATE trackstatuscount SET count = count - 1 WHERE status = OLD.status;
+        END""",
+    "track_status_count_update": """
+        AFTER UPDATE OF status ON track WHEN OLD.status IS NOT NEW.status BEGIN
+            UPDATE trackstatuscount SET count = count - 1 WHERE status = OLD.status;
+            INSERT INTO trackstatuscount (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END""",
+}
+
+
+@migration(5, "track status counters")
+def _status_counters(conn: Connection) -> None:
+    """
+    Keep TrackStatusCount in step with Track inside the same transaction.
+
+    Triggers catch every write path (ORM, bulk inserts, UPDATE statements), so
+    reading the counts never has to scan the track table.
+    """
+    for name, body in _STATUS_COUNT_TRIGGERS.items():
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    conn.exec_driver_sql("DELETE FROM trackstatuscount")
+    conn.exec_driver_sql(
+        "INSERT INTO trackstatuscount (status, count) SELECT status, COUNT(*) FROM track GROUP BY status"
+    )
+
+
+@migration(6, "keyset pagination indexes")
+def _pagination_indexes(conn: Connection) -> None:
+    for name in ("ix_track_requested_at_id", "ix_track_status_requested_at", "ix_track_source_requested_at"):
+        create_index(conn, Track, name)
+
+
+@migration(7, "track retry schedule")
+def _retry_schedule(conn: Connection) -> None:
+    for name in ("error_kind", "attempts", "next_attempt_at"):
+        add_column(conn, Track, name)
+
+
+@migration(8, "output format setting")
+def _output_format_setting(conn: Connection) -> None:
+    add_column(conn, Settings, "output_format")
+
+
+@migration(9, "fingerprint candidate keys", batched=True)
+def _backfill_fingerprint_keys() -> None:
+    from .fingerprint import fingerprint_keys
+
+    last = ""
+    while True:
+        with write_lock, Session(engine) as session:
+            rows = session.exec(
+                select(Fingerprint.file_hash, Fingerprint.fingerprint)
+                .where(Fingerprint.file_hash > last)
+                .order_by(Fingerprint.file_hash)
+                .limit(_BACKFILL_BATCH)
+            ).all()
+            if not rows:
+                break
+            keys = [{"key": key, "file_hash": h} for h, blob in rows for key in fingerprint_keys(blob)]
+            if keys:
+                session.exec(insert(FingerprintKey).prefix_with("OR IGNORE"), params=keys)
+            session.commit()
+        last = rows[-1][0]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def _current_version() -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def run_migrations() -> None:
+    """Apply every migration newer than the database's user_version."""
+    versions = [version for version, *_ in _MIGRATIONS]
+    assert versions == sorted(set(versions)), "migration versions must be unique and ascending"
+
+    current = _current_version()
+    for version, description, fn, batched in _MIGRATIONS:
+        if version <= current:
+            continue
+        _log(f"Migrating to schema v{version}: {description}")
+        if batched:
+            fn()
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+        else:
+            with write_lock, engine.begin() as conn:
+                fn(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {version}")
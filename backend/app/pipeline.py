@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlmodel import Session, or_, select, update
+
+from . import fingerprint, library, metrics, ratelimit
+from .database import Settings, Track, engine, get_settings
+from .downloader import (
+    _search_with_fallbacks,
+    close_thread_ydl_instances,
+    close_ydl_instances,
+    fetch_audio,
+    finalize_audio,
+    find_output,
+    plan_track,
+    take_search_failed,
+)
+
+# ---------------------------------------------------------------------------
+# Staged download pipeline
+#
+#   queued Track ─► resolve (YouTube search) ─► fetch (yt-dlp) ─► transcode + tag
+#
+# Every stage has its own worker threads and hands jobs to the next one via a
+# bounded queue, so a slow FFmpeg encode never blocks the next search and
+# search latency is hidden behind running downloads.
+# ---------------------------------------------------------------------------
+
+_HANDOFF_DEPTH = 4  # max jobs waiting between two stages
+_IDLE_POLL_SEC = 60  # resolvers re-check the queue this often even without a wake-up
+
+
+@dataclass
+class Job:
+    track_id: int
+    title: str
+    artist: Optional[str]
+    album: Optional[str]
+    quality: str
+    output_format: str
+    template: str
+    max_retries: int
+    duration_ms: Optional[int] = None
+    youtube_url: Optional[str] = None
+    final_path: Optional[str] = None
+    downloaded: Optional[str] = None
+    fingerprint: bool = False
+
+    @property
+    def label(self) -> str:
+        return f"{self.artist} - {self.title}" if self.artist else self.title
+
+
+_state_lock = threading.Lock()
+_in_flight: dict[int, dict] = {}  # track_id -> {track_id, title, artist, stage}
+_stopping = threading.Event()
+_wake = threading.Event()
+
+_fetch_queue: queue.Queue[Job] = queue.Queue(maxsize=_HANDOFF_DEPTH)
+_transcode_queue: queue.Queue[Job] = queue.Queue(maxsize=_HANDOFF_DEPTH)
+
+_breaker = {"consecutive": 0, "trips": 0, "open_until": 0.0}
+
+_limits = {"resolve": 0, "fetch": 0, "transcode": 0}
+_threads: dict[str, list[Optional[threading.Thread]]] = {stage: [] for stage in _limits}
+
+
+def _log(msg: str) -> None:
+    print(f"[downloader] {msg}", flush=True)
+
+
+def get_state() -> dict:
+    with _state_lock:
+        downloading = list(_in_flight.values())
+    return {
+        # Kept for older clients that only show a single track
+        "currently_downloading": downloading[0] if downloading else None,
+        "downloading": downloading,
+        "workers": dict(_limits),
+        "stage_queues": {
+            "fetch": _fetch_queue.qsize(),
+            "transcode": _transcode_queue.qsize(),
+        },
+        "circuit_breaker": {
+            "open": _breaker_delay() > 0,
+            "resumes_in_sec": round(_breaker_delay()),
+            "consecutive_rate_limits": _breaker["consecutive"],
+        },
+    }
+
+
+def _set_stage(job: Job, stage: str) -> None:
+    with _state_lock:
+        _in_flight[job.track_id] = {
+            "track_id": job.track_id,
+            "title": job.title,
+            "artist": job.artist,
+            "stage": stage,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Database helpers
+# ---------------------------------------------------------------------------
+
+def _claim_next_track() -> Optional[Job]:
+    """
+    Atomically move the oldest queued track that is due to ``downloading``.
+
+    The conditional UPDATE only succeeds for one worker per row, so losers
+    of a race simply try the next candidate. Tracks waiting for a scheduled
+    retry are passed over until their next_attempt_at.
+    """
+    with metrics.CLAIM_SECONDS.time(), Session(engine) as session:
+        while True:
+            track_id = session.exec(
+                select(Track.id)
+                .where(
+                    Track.status == "queued",
+                    or_(Track.next_attempt_at.is_(None), Track.next_attempt_at <= datetime.utcnow()),
+                )
+                .order_by(Track.requested_at)
+                .limit(1)
+            ).first()
+            if track_id is None:
+                return None
+
+            result = session.exec(
+                update(Track)
+                .where(Track.id == track_id, Track.status == "queued")
+                .values(status="downloading")
+            )
+            session.commit()
+            if result.rowcount != 1:
+                continue
+
+            track = session.get(Track, track_id)
+            settings = get_settings(session)
+            ratelimit.set_min_interval(settings.sleep_between_downloads)
+            return Job(
+                track_id=track.id,
+                title=track.title,
+                artist=track.artist,
+                album=track.album,
+                quality=settings.quality,
+                output_format=settings.output_format,
+                template=settings.file_template,
+                max_retries=settings.max_retries,
+                duration_ms=track.duration_ms,
+                youtube_url=track.youtube_url,
+                fingerprint=settings.fingerprint_dedup and fingerprint.available(),
+            )
+
+
+def _save_youtube_url(job: Job, url: Optional[str]) -> None:
+    with Session(engine) as session:
+        t = session.get(Track, job.track_id)
+        if t:
+            t.youtube_url = url
+            session.add(t)
+            session.commit()
+
+
+def _finish(job: Job, status: str, *, file_path: Optional[str] = None) -> None:
+    metrics.TRACKS_FINISHED.labels(status, "").inc()
+    with _state_lock:
+        _in_flight.pop(job.track_id, None)
+
+    with Session(engine) as session:
+        t = session.get(Track, job.track_id)
+        if not t:
+            return
+        t.status = status
+        if file_path:
+            t.file_path = file_path
+        if status == "done":
+            t.downloaded_at = datetime.now(timezone.utc)
+        # Clear what earlier failed attempts left behind
+        t.error_msg = t.error_kind = t.next_attempt_at = None
+        session.add(t)
+        session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Failure handling
+#
+# Failures are classified so that transient ones (YouTube throttling, flaky
+# extractor or FFmpeg runs) go back to the queue with a growing delay, while
+# permanent ones (nothing on YouTube, an unusable file name) stay failed and
+# are not searched again. Consecutive rate-limited tracks open a circuit
+# breaker that stops resolvers from claiming new tracks for a while, so a
+# throttled session doesn't burn through the whole queue.
+# ---------------------------------------------------------------------------
+
+# kind -> (delay before the first retry in seconds, attempts before giving up)
+_RETRY_POLICY = {
+    "rate_limited": (15 * 60, 8),
+    "extractor": (30 * 60, 3),
+    "ffmpeg": (5 * 60, 2),
+    "error": (30 * 60, 3),
+}
+_MAX_RETRY_DELAY_SEC = 12 * 3600
+_BREAKER_THRESHOLD = 3  # consecutive rate-limited tracks
+_BREAKER_COOLDOWN_SEC = 10 * 60
+_BREAKER_MAX_COOLDOWN_SEC = 60 * 60
+
+
+def _breaker_delay() -> float:
+    return max(0.0, _breaker["open_until"] - time.monotonic())
+
+
+def _record_outcome(kind: Optional[str]) -> None:
+    """Feed the circuit breaker: None for a successful download, else the failure kind."""
+    with _state_lock:
+        if kind is None:
+            _breaker["consecutive"] = _breaker["trips"] = 0
+            return
+        if kind != "rate_limited":
+            return  # says nothing about throttling
+        _breaker["consecutive"] += 1
+        # Once tripped, a single further rate limit after the cooldown re-opens it for longer
+        if _breaker["consecutive"] < _BREAKER_THRESHOLD or _breaker_delay() > 0:
+            return
+        cooldown = min(_BREAKER_COOLDOWN_SEC * 2 ** _breaker["trips"], _BREAKER_MAX_COOLDOWN_SEC)
+        _breaker["trips"] += 1
+        _breaker["open_until"] = time.monotonic() + cooldown
+    _log(f"Tracks keep getting rate-limited — pausing new downloads for {cooldown // 60} min")
+
+
+def _network_failure_kind(error: Optional[str]) -> str:
+    return "rate_limited" if ratelimit.take_throttled() or ratelimit.is_throttle_error(error) else "extractor"
+
+
+def _fail(job: Job, kind: str, error: str) -> None:
+    """Schedule a retry for transient failures, or mark the track failed for good."""
+    _record_outcome(kind)
+    with _state_lock:
+        _in_flight.pop(job.track_id, None)
+
+    with Session(engine) as session:
+        t = session.get(Track, job.track_id)
+        if not t:
+            return
+        t.attempts += 1
+        t.error_kind = kind
+        t.error_msg = error
+        policy = _RETRY_POLICY.get(kind)
+        if policy and t.attempts < policy[1]:
+            delay = min(policy[0] * 2 ** (t.attempts - 1), _MAX_RETRY_DELAY_SEC)
+            t.status = "queued"
+            t.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            _log(f"Retry {t.attempts}/{policy[1] - 1} in {delay // 60} min ({kind}): {error}")
+        else:
+            t.status = "failed"
+            t.next_attempt_at = None
+            _log(f"FAILED ({kind}): {error}")
+        metrics.TRACKS_FINISHED.labels(t.status, kind).inc()
+        session.add(t)
+        session.commit()
+
+
+def requeue_interrupted() -> None:
+    """Tracks left in ``downloading`` by a previous run would otherwise never finish."""
+    with Session(engine) as session:
+        result = session.exec(
+            update(Track).where(Track.status == "downloading").values(status="queued")
+        )
+        session.commit()
+        if result.rowcount:
+            print(f"[scheduler] Re-queued {result.rowcount} interrupted downloads", flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def _handoff(q: queue.Queue[Job], job: Job) -> None:
+    """Blocking put that still notices shutdown; an undelivered job is re-queued on restart."""
+    _set_stage(job, "waiting")
+    while not _stopping.is_set():
+        try:
+            q.put(job, timeout=1)
+            return
+        except queue.Full:
+            continue
+
+
+def _resolve(job: Job) -> None:
+    _set_stage(job, "searching")
+    final_path, error = plan_track(
+        title=job.title,
+        artist=job.artist,
+        album=job.album,
+        output_dir=os.environ.get("OUTPUT_DIR", "/music"),
+        template=job.template,
+    )
+    if error:
+        _fail(job, "invalid", error)
+        return
+
+    stored = find_output(final_path)
+    if stored:
+        _log(f"Already exists: {os.path.basename(stored)}")
+        _finish(job, "skipped", file_path=stored)
+        return
+
+    existing = library.find_existing(job.artist, job.title)
+    if existing:
+        _log(f"Already in library: {os.path.relpath(existing, library.OUTPUT_DIR)}")
+        _finish(job, "skipped", file_path=existing)
+        return
+
+    if not job.youtube_url:
+        _log(f"Searching: {job.label}")
+        ratelimit.take_throttled()
+        take_search_failed()
+        job.youtube_url = _search_with_fallbacks(job.title or "", job.artist or "", job.duration_ms)
+        if not job.youtube_url:
+            # Search swallows its errors, so throttled or failed searches also end up here
+            if ratelimit.take_throttled():
+                _fail(job, "rate_limited", f"Rate-limited while searching for: {job.label}")
+            elif take_search_failed():
+                _fail(job, "extractor", f"YouTube search failed for: {job.label}")
+            else:
+                _fail(job, "not_found", f"No YouTube result found for: {job.label}")
+            return
+        _save_youtube_url(job, job.youtube_url)
+
+    job.final_path = final_path
+    _handoff(_fetch_queue, job)
+
+
+def _fetch(job: Job) -> None:
+    _set_stage(job, "downloading")
+    ratelimit.take_throttled()
+    job.downloaded, error = fetch_audio(job.youtube_url, job.final_path, job.max_retries)
+    if error:
+        kind = _network_failure_kind(error)
+        if kind != "rate_limited":
+            # The stored URL may be the problem (removed video, region lock) — search again next time
+            _save_youtube_url(job, None)
+        _fail(job, kind, error)
+        return
+    _record_outcome(None)
+    _handoff(_transcode_queue, job)
+
+
+def _transcode(job: Job) -> None:
+    _set_stage(job, "transcoding")
+    stored, error = finalize_audio(
+        job.downloaded,
+        job.final_path,
+        quality=job.quality,
+        title=job.title,
+        artist=job.artist,
+        album=job.album,
+        output_format=job.output_format,
+    )
+    if error:
+        _fail(job, "ffmpeg", error)
+        return
+    job.final_path = stored
+
+    if job.fingerprint:
+        _set_stage(job, "fingerprinting")
+        duplicate = fingerprint.check_file(job.final_path)
+        if duplicate:
+            _log(f"Same recording already in library: {os.path.basename(duplicate)}")
+            os.remove(job.final_path)
+            _finish(job, "skipped", file_path=duplicate)
+            return
+
+    _log(f"Downloaded: {os.path.basename(job.final_path)}")
+    library.index_file(job.final_path)
+    _finish(job, "done", file_path=job.final_path)
+
+
+def _run(job: Job, stage_fn: Callable[[Job], None]) -> None:
+    started = time.perf_counter()
+    try:
+        stage_fn(job)
+    except Exception as exc:
+        _fail(job, "error", str(exc))
+    finally:
+        metrics.STAGE_SECONDS.labels(stage_fn.__name__.lstrip("_")).observe(time.perf_counter() - started)
+
+
+def _resolve_loop(index: int) -> None:
+    try:
+        while not _stopping.is_set() and index < _limits["resolve"]:
+            if _breaker_delay() > 0:
+                _stopping.wait(min(_breaker_delay(), _IDLE_POLL_SEC))
+                continue
+            _wake.clear()
+            job = _claim_next_track()
+            if job is None:
+                _wake.wait(timeout=_IDLE_POLL_SEC)
+                continue
+            _run(job, _resolve)
+    finally:
+        # YoutubeDL instances are per thread; a surplus worker must not leave its own open
+        close_thread_ydl_instances()
+
+
+def _queue_loop(stage: str, q: queue.Queue[Job], stage_fn: Callable[[Job], None]) -> Callable[[int], None]:
+    def loop(index: int) -> None:
+        try:
+            while not _stopping.is_set() and index < _limits[stage]:
+                try:
+                    job = q.get(timeout=1)
+                except queue.Empty:
+                    continue
+                _run(job, stage_fn)
+        finally:
+            close_thread_ydl_instances()
+    return loop
+
+
+_LOOPS: dict[str, Callable[[int], None]] = {
+    "resolve": _resolve_loop,
+    "fetch": _queue_loop("fetch", _fetch_queue, _fetch),
+    "transcode": _queue_loop("transcode", _transcode_queue, _transcode),
+}
+
+
+# ---------------------------------------------------------------------------
+# Control
+# ---------------------------------------------------------------------------
+
+def ensure_workers(settings: Settings) -> None:
+    """
+    Apply the configured concurrency of every stage.
+
+    Missing workers are started; surplus ones exit after their current job.
+    """
+    if _stopping.is_set():
+        return
+
+    wanted = {
+        "resolve": max(1, settings.search_workers),
+        "fetch": max(1, settings.download_workers),
+        "transcode": max(1, settings.transcode_workers),
+    }
+    with _state_lock:
+        for stage, size in wanted.items():
+            _limits[stage] = size
+            threads = _threads[stage]
+            while len(threads) < size:
+                threads.append(None)
+            for i in range(size):
+                worker = threads[i]
+                if worker is None or not worker.is_alive():
+                    worker = threading.Thread(
+                        target=_LOOPS[stage], args=(i,), name=f"{stage}-worker-{i}", daemon=True
+                    )
+                    threads[i] = worker
+                    worker.start()
+
+
+def wake() -> None:
+    """Tell idle resolvers to look for queued tracks now instead of at their next poll."""
+    _wake.set()
+
+
+def start() -> None:
+    _stopping.clear()
+    requeue_interrupted()
+
+
+def stop() -> None:
+    _stopping.set()
+    _wake.set()
+    close_ydl_instances()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from . import metrics
+
+# ---------------------------------------------------------------------------
+# Shared YouTube rate limiter
+#
+# Every yt-dlp request (searches and downloads, from all pipeline workers)
+# takes a token from one bucket. The refill rate adapts AIMD-style: it grows
+# by a small step after each success and is halved when YouTube answers with
+# a 429 or a bot check, which also pauses all traffic for a cooldown that
+# doubles while throttling continues. The rate never drops below one request
+# per Settings.sleep_between_downloads seconds, the old fixed pace; that floor
+# is capped at half the ceiling so a throttle always has room to slow down.
+# ---------------------------------------------------------------------------
+
+_START_RATE = 0.5  # requests/second after startup
+_MAX_RATE = float(os.environ.get("YT_MAX_RATE", "2.0"))
+_INCREASE_STEP = 0.02  # added per successful request
+_DECREASE_FACTOR = 0.5
+_BURST = 3  # tokens that can accumulate while idle
+_COOLDOWN_SEC = 30
+_MAX_COOLDOWN_SEC = 900
+_EVENTS_KEPT = 20
+
+_THROTTLE_PATTERN = re.compile(
+    r"HTTP Error 429|Too Many Requests|Sign in to confirm you.re not a bot|rate.?limit",
+    re.IGNORECASE,
+)
+
+_cond = threading.Condition()
+_rate = _START_RATE
+_min_rate = 1 / 7
+_tokens = 1.0
+_refilled_at = time.monotonic()
+_paused_until = 0.0
+_strikes = 0  # consecutive throttles without a success in between
+_events: deque[dict] = deque(maxlen=_EVENTS_KEPT)
+_local = threading.local()  # per-thread "was I throttled?" flag, see take_throttled()
+_stats = {"requests": 0, "throttles": 0, "waited_sec": 0.0}
+
+
+def _log(msg: str) -> None:
+    print(f"[ratelimit] {msg}", flush=True)
+
+
+def is_throttle_error(message: Optional[str]) -> bool:
+    return bool(message) and _THROTTLE_PATTERN.search(message) is not None
+
+
+def set_min_interval(seconds: float) -> None:
+    """Slowest pace to fall back to, from Settings.sleep_between_downloads."""
+    global _min_rate, _rate
+    with _cond:
+        _min_rate = min(1 / seconds if seconds > 0 else _MAX_RATE, _MAX_RATE * _DECREASE_FACTOR)
+        _rate = max(_rate, _min_rate)
+
+
+def _refill(now: float) -> None:
+    global _tokens, _refilled_at
+    _tokens = min(_BURST, _tokens + (now - _refilled_at) * _rate)
+    _refilled_at = now
+
+
+def acquire() -> None:
+    """Block until the next YouTube request may go out."""
+    global _tokens
+    started = time.monotonic()
+    with _cond:
+        while True:
+            now = time.monotonic()
+            _refill(now)
+            if now >= _paused_until and _tokens >= 1:
+                _tokens -= 1
+                _stats["requests"] += 1
+                _stats["waited_sec"] += now - started
+                metrics.RATE_LIMIT_WAIT_SECONDS.observe(now - started)
+                return
+            if now < _paused_until:
+                delay = _paused_until - now
+            else:
+                delay = (1 - _tokens) / _rate
+            # Woken early when the rate or pause changes
+            _cond.wait(timeout=delay)
+
+
+def record_success() -> None:
+    global _rate, _strikes
+    with _cond:
+        _strikes = 0
+        _rate = min(_MAX_RATE, _rate + _INCREASE_STEP)
+
+
+def take_throttled() -> bool:
+    """Whether the calling thread hit throttling since it last asked; resets the flag."""
+    throttled = getattr(_local, "throttled", False)
+    _local.throttled = False
+    return throttled
+
+
+def record_throttle(message: str) -> None:
+    global _rate, _strikes, _paused_until, _tokens
+    _local.throttled = True
+    with _cond:
+        now = time.monotonic()
+        if now < _paused_until:
+            return  # requests already in flight when the pause started — same incident
+        _refill(now)
+        _strikes += 1
+        _rate = max(_min_rate, _rate * _DECREASE_FACTOR)
+        cooldown = min(_COOLDOWN_SEC * 2 ** (_strikes - 1), _MAX_COOLDOWN_SEC)
+        _paused_until = now + cooldown
+        _tokens = 0.0
+        _stats["throttles"] += 1
+        metrics.RATE_LIMIT_EVENTS.inc()
+        _events.append({
+            "at": datetime.utcnow().isoformat(),
+            "rate": round(_rate, 3),
+            "cooldown_sec": cooldown,
+            "message": message.strip()[:200],
+        })
+        _cond.notify_all()
+    _log(f"Throttled by YouTube — pausing {cooldown}s, rate now {_rate:.2f} req/s")
+
+
+def get_state() -> dict:
+    with _cond:
+        now = time.monotonic()
+        return {
+            "rate_per_sec": round(_rate, 3),
+            "min_rate_per_sec": round(_min_rate, 3),
+            "max_rate_per_sec": _MAX_RATE,
+            "paused_for_sec": round(max(0.0, _paused_until - now), 1),
+            "requests": _stats["requests"],
+            "throttles": _stats["throttles"],
+            "waited_sec": round(_stats["waited_sec"], 1),
+            "recent_throttles": list(_events),
+        }
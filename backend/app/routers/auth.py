@@ -14,6 +14,7 @@ from spotipy.oauth2 import SpotifyOAuth as SpotipyOAuth
 from spotipy import Spotify
 
 from ..database import SpotifyOAuth as SpotifyOAuthModel, get_session
+from ..spotdl_client import spotify_client
 
 router = APIRouter(tags=["auth"])
 
@@ -80,7 +81,7 @@ def get_spotify_client(session: Session = Depends(get_session)) -> Optional[Spot
     token = get_valid_token(session)
     if not token:
         return None
-    return Spotify(auth=token)
+    return spotify_client(token)
 
 
 @router.get("/auth/status", response_model=AuthStatus)
@@ -1,21 +1,49 @@
 from __future__ import annotations
 
+import base64
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import tuple_
 from sqlmodel import Session, func, select
 
-from ..database import Track, get_session
+from ..database import Track, TrackStatusCount, get_session
 
 router = APIRouter()
 
 
+def _encode_cursor(track: Track) -> str:
+    raw = f"{track.requested_at.isoformat()}|{track.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        requested_at, track_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(requested_at), int(track_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _total(session: Session, query, status: Optional[str], source: Optional[str]) -> int:
+    """Per-status totals come from the counter table; only source filters need a COUNT."""
+    if not source:
+        counts = select(func.coalesce(func.sum(TrackStatusCount.count), 0))
+        if status:
+            counts = counts.where(TrackStatusCount.status == status)
+        return session.exec(counts).one()
+    return session.exec(select(func.count()).select_from(query.subquery())).one()
+
+
 @router.get("/downloads")
 def list_downloads(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=200),
     status: Optional[str] = None,
     source: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    with_total: bool = True,
     session: Session = Depends(get_session),
 ):
     query = select(Track)
@@ -24,11 +52,22 @@ def list_downloads(
     if source:
         query = query.where(Track.source == source)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    items = session.exec(
-        query.order_by(Track.requested_at.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-    ).all()
+    total = _total(session, query, status, source) if with_total else None
+
+    # Keyset pagination: (requested_at, id) is unique and indexed, so any page
+    # is an index seek instead of skipping over every earlier row
+    ordered = query.order_by(Track.requested_at.desc(), Track.id.desc())
+    if cursor:
+        ordered = ordered.where(tuple_(Track.requested_at, Track.id) < _decode_cursor(cursor))
+    else:
+        ordered = ordered.offset((page - 1) * limit)
+    items = session.exec(ordered.limit(limit + 1)).all()
 
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    next_cursor = _encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return {
+        "items": items[:limit],
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import codecs
 import csv
-import io
+import itertools
+import os
+import tempfile
+from typing import Iterable, Iterator
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from sqlmodel import Session, or_, select, func
+from fastapi import APIRouter, File, UploadFile, HTTPException
+from sqlalchemy import insert
+from sqlmodel import Session, select
 
-from ..database import Track, get_session
+from .. import library
+from ..database import Track, engine, make_dedup_key, write_lock
+from ..jobs import start_job, update_job
+from ..scheduler import notify_queued
 
 router = APIRouter()
 
@@ -18,66 +26,74 @@ _TITLE_COLS = ["track name", "title", "song", "name", "track"]
 _ARTIST_COLS = ["artist name(s)", "artist names", "artist name", "artist", "artists", "performer"]
 _ALBUM_COLS = ["album name", "album", "release"]
 _ID_COLS = ["spotify id", "spotify_id", "track id", "track_id", "uri", "id"]
+_DURATION_COLS = ["duration (ms)", "duration_ms", "track duration (ms)"]
+_ISRC_COLS = ["isrc"]
 
+_CHUNK_SIZE = 1024 * 1024
+_BATCH_SIZE = 500
 
-def _find_col(headers: list[str], candidates: list[str]) -> str | None:
-    """Return the first header that matches any candidate (case-insensitive)."""
+
+def _find_col(headers: list[str], candidates: list[str]) -> int | None:
+    """Return the index of the first header that matches any candidate (case-insensitive)."""
     lower = [h.lower().strip() for h in headers]
     for c in candidates:
         if c in lower:
-            return headers[lower.index(c)]
+            return lower.index(c)
     return None
 
 
-def _parse_csv(content: str) -> list[dict]:
+def _cell(row: list[str], index: int | None) -> str:
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _iter_csv(lines: Iterable[str]) -> Iterator[dict]:
     """
-    Parse CSV content and return a list of dicts with keys: title, artist, album, spotify_id.
+    Parse CSV lines in a single pass and yield dicts with keys: title, artist, album,
+    spotify_id, duration_ms, isrc.
     Supports:
       - Exportify format (header row with recognized column names)
       - Simple 2-column format: Title,Artist or Artist,Title
       - One-column "Artist - Title" or "Title" per line (no header)
     """
-    lines = content.splitlines()
-    if not lines:
-        return []
+    reader = csv.reader(lines)
+    headers = next(reader, None)
+    if headers is None:
+        return
 
-    reader = csv.reader(io.StringIO(content))
-    rows = list(reader)
-    if not rows:
-        return []
-
-    headers = rows[0]
     title_col = _find_col(headers, _TITLE_COLS)
     artist_col = _find_col(headers, _ARTIST_COLS)
     album_col = _find_col(headers, _ALBUM_COLS)
     id_col = _find_col(headers, _ID_COLS)
+    duration_col = _find_col(headers, _DURATION_COLS)
+    isrc_col = _find_col(headers, _ISRC_COLS)
 
-    results = []
-
-    if title_col:
+    if title_col is not None:
         # Header row present — use named columns
-        dict_reader = csv.DictReader(io.StringIO(content))
-        for row in dict_reader:
-            title = row.get(title_col, "").strip()
+        for row in reader:
+            title = _cell(row, title_col)
             if not title:
                 continue
             # Artist may be comma-separated list (Exportify); take the first one
-            artist_raw = row.get(artist_col or "", "").strip() if artist_col else None
+            artist_raw = _cell(row, artist_col)
             artist = artist_raw.split(",")[0].strip() if artist_raw else None
-            album = row.get(album_col or "", "").strip() if album_col else None or None
-            spotify_id = row.get(id_col or "", "").strip() if id_col else None
+            spotify_id = _cell(row, id_col)
             # Exportify stores as "spotify:track:xxxx" — extract just the ID part
-            if spotify_id and spotify_id.startswith("spotify:track:"):
+            if spotify_id.startswith("spotify:track:"):
                 spotify_id = spotify_id.split(":")[-1]
-            results.append({
+            duration_raw = _cell(row, duration_col)
+            yield {
                 "title": title,
                 "artist": artist or None,
-                "album": album or None,
+                "album": _cell(row, album_col) or None,
                 "spotify_id": spotify_id or None,
-            })
+                "duration_ms": int(duration_raw) if duration_raw.isdigit() else None,
+                "isrc": _cell(row, isrc_col) or None,
+            }
     else:
         # No recognised header — treat as headerless
-        for row in rows:
+        for row in itertools.chain([headers], reader):
             if not row:
                 continue
             cell = row[0].strip()
@@ -95,79 +111,146 @@ def _parse_csv(content: str) -> list[dict]:
                 title = cell
                 artist = None
             if title:
-                results.append({
+                yield {
                     "title": title,
                     "artist": artist or None,
                     "album": None,
                     "spotify_id": None,
+                    "duration_ms": None,
+                    "isrc": None,
+                }
+
+
+# ---------------------------------------------------------------------------
+# Background import
+# ---------------------------------------------------------------------------
+
+def _insert_batch(session: Session, rows: list[dict]) -> None:
+    with write_lock:
+        session.exec(insert(Track), params=rows)
+        session.commit()
+    notify_queued()
+
+
+def _run_import(job_id: str, path: str, encoding: str) -> dict:
+    """Stream the spooled CSV into the database in batched transactions."""
+    total_bytes = os.path.getsize(path) or 1
+    total = imported = skipped = already_have = 0
+    try:
+        with open(path, encoding=encoding, newline="") as f, Session(engine) as session:
+            # Load every existing dedup key once instead of querying per row
+            existing_ids: set[str] = set()
+            existing_keys: set[str] = set()
+            existing_titles: set[str] = set()
+            for spotify_id, key in session.exec(select(Track.spotify_id, Track.dedup_key)).all():
+                if spotify_id:
+                    existing_ids.add(spotify_id)
+                if key:
+                    existing_keys.add(key)
+                    existing_titles.add(key.split("|", 1)[1])
+            # Songs already in the music folder are recorded as skipped rather than searched for
+            in_library = library.key_paths()
+
+            batch: list[dict] = []
+            for item in _iter_csv(f):
+                total += 1
+                title = item["title"]
+                artist = item["artist"]
+                spotify_id = item["spotify_id"]
+                key = make_dedup_key(artist, title)
+
+                # Duplicate by spotify_id, by artist + title, or — without an artist — by title alone.
+                # The sets also grow as rows are accepted, which catches repeats within the file.
+                if (
+                    (spotify_id and spotify_id in existing_ids)
+                    or key in existing_keys
+                    or (not artist and key.split("|", 1)[1] in existing_titles)
+                ):
+                    skipped += 1
+                    continue
+
+                if spotify_id:
+                    existing_ids.add(spotify_id)
+                existing_keys.add(key)
+                existing_titles.add(key.split("|", 1)[1])
+
+                library_path = in_library.get(key)
+                if library_path:
+                    already_have += 1
+                batch.append({
+                    "spotify_id": spotify_id,
+                    "title": title,
+                    "artist": artist,
+                    "album": item["album"],
+                    "duration_ms": item["duration_ms"],
+                    "isrc": item["isrc"],
+                    "dedup_key": key,
+                    "status": "skipped" if library_path else "queued",
+                    "file_path": library_path,
+                    "source": "playlist",
                 })
 
-    return results
+                if len(batch) >= _BATCH_SIZE:
+                    _insert_batch(session, batch)
+                    imported += len(batch)
+                    batch = []
+                    update_job(job_id, processed=total, progress=min(f.buffer.tell() / total_bytes, 0.99))
+
+            if batch:
+                _insert_batch(session, batch)
+                imported += len(batch)
+    finally:
+        os.unlink(path)
+
+    if not total:
+        raise ValueError("No tracks found in CSV. Check the file format.")
+
+    # Library matches are inserted (as skipped) but not queued
+    imported -= already_have
+    skipped += already_have
+
+    update_job(job_id, processed=total)
+    print(f"[import] CSV import finished: {imported} queued, {skipped} skipped", flush=True)
+    return {
+        "ok": True,
+        "total": total,
+        "imported": imported,
+        "skipped": skipped,
+    }
 
 
 # ---------------------------------------------------------------------------
 # Route
 # ---------------------------------------------------------------------------
 
-@router.post("/import/csv")
+@router.post("/import/csv", status_code=202)
 async def import_csv(
     file: UploadFile = File(description="CSV playlist export (Exportify or similar)"),
-    session: Session = Depends(get_session),
 ):
     if not file.filename or not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only .csv files are accepted.")
 
-    raw = await file.read()
-    try:
-        content = raw.decode("utf-8-sig")  # utf-8-sig strips BOM (common in Excel exports)
-    except UnicodeDecodeError:
-        content = raw.decode("latin-1")
-
-    parsed = _parse_csv(content)
-    if not parsed:
-        raise HTTPException(status_code=400, detail="No tracks found in CSV. Check the file format.")
-
-    imported = 0
-    skipped = 0
-
-    for item in parsed:
-        title = item["title"]
-        artist = item["artist"]
-        spotify_id = item["spotify_id"]
-
-        # Check for duplicate by spotify_id (if present) or title+artist
-        existing = None
-        if spotify_id:
-            existing = session.exec(
-                select(Track).where(Track.spotify_id == spotify_id)
-            ).first()
-        if not existing:
-            # Case-insensitive title + artist match
-            filters = [func.lower(Track.title) == title.lower()]
-            if artist:
-                filters.append(func.lower(Track.artist) == artist.lower())
-            existing = session.exec(select(Track).where(*filters)).first()
-
-        if existing:
-            skipped += 1
-            continue
-
-        track = Track(
-            spotify_id=spotify_id,
-            title=title,
-            artist=artist,
-            album=item["album"],
-            status="queued",
-            source="playlist",
-        )
-        session.add(track)
-        imported += 1
-
-    session.commit()
+    # Copy the upload to our own temp file in chunks (the background job outlives the
+    # request) and check the encoding on the way, so parsing can stream in one pass.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    encoding = "utf-8-sig"  # utf-8-sig strips BOM (common in Excel exports)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        try:
+            while chunk := await file.read(_CHUNK_SIZE):
+                tmp.write(chunk)
+                if encoding != "latin-1":
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        encoding = "latin-1"
+            if encoding != "latin-1":
+                try:
+                    decoder.decode(b"", final=True)
+                except UnicodeDecodeError:
+                    encoding = "latin-1"
+        except Exception as e:
+            os.unlink(tmp.name)
+            raise HTTPException(status_code=500, detail=f"Failed to read uploaded file: {e}")
 
-    return {
-        "ok": True,
-        "total": len(parsed),
-        "imported": imported,
-        "skipped": skipped,
-    }
+    job = start_job("import_csv", _run_import, tmp.name, encoding)
+    return {"ok": True, "job_id": job.id}
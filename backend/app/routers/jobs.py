@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from ..jobs import get_job
+
+router = APIRouter(tags=["jobs"])
+
+_EVENT_POLL_SEC = 0.5
+
+
+@router.get("/jobs/{job_id}")
+def read_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: one message per change of the job, closed once it finishes."""
+    if not get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last = None
+        while not await request.is_disconnected():
+            job = get_job(job_id)
+            if job is None:
+                return
+            if job != last:
+                last = job
+                yield f"data: {json.dumps(jsonable_encoder(job))}\n\n"
+            if job["status"] != "running":
+                return
+            await asyncio.sleep(_EVENT_POLL_SEC)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # nginx would otherwise buffer the stream until it ends
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
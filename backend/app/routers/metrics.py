@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from .. import metrics, pipeline, ratelimit, transcode
+from ..database import get_status_counts
+
+router = APIRouter()
+
+
+def _refresh_gauges() -> None:
+    for status, count in get_status_counts().items():
+        metrics.TRACKS.labels(status).set(count)
+
+    state = pipeline.get_state()
+    for stage, depth in state["stage_queues"].items():
+        metrics.PIPELINE_QUEUE.labels(stage).set(depth)
+    metrics.PIPELINE_IN_FLIGHT.set(len(state["downloading"]))
+    metrics.PIPELINE_BREAKER_OPEN.set(int(state["circuit_breaker"]["open"]))
+
+    ffmpeg = transcode.get_stats()
+    for priority, depth in ffmpeg["queued"].items():
+        metrics.FFMPEG_QUEUED.labels(priority).set(depth)
+    metrics.FFMPEG_RUNNING.set(ffmpeg["running"])
+
+    metrics.RATE_LIMIT_RATE.set(ratelimit.get_state()["rate_per_sec"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    _refresh_gauges()
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
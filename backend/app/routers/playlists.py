@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from spotipy import Spotify
 from sqlmodel import Session, select
 
-from ..database import MonitoredPlaylist, Track, engine
-from ..spotdl_client import extract_playlist_id, fetch_playlist_info, sync_playlist
-from .auth import get_spotify_client, get_valid_token
+from ..database import MonitoredPlaylist, SpotifyOAuth, Track, engine, write_lock, write_session
+from ..jobs import start_job, update_job
+from ..spotdl_client import PlaylistTrack, extract_playlist_id, fetch_playlist_info, spotify_client
+from ..scheduler import notify_queued
+from .auth import get_valid_token
 
 router = APIRouter(tags=["playlists"])
 
@@ -47,67 +52,160 @@ def list_playlists(session: Session = Depends(get_session)):
     return playlists
 
 
-@router.post("/playlists", response_model=PlaylistResponse)
-def add_playlist(body: PlaylistCreate, session: Session = Depends(get_session)):
-    playlist_id = extract_playlist_id(body.url)
-    if not playlist_id:
-        raise HTTPException(status_code=400, detail="Invalid Spotify playlist URL")
-    
-    existing = session.exec(
-        select(MonitoredPlaylist).where(MonitoredPlaylist.spotify_id == playlist_id)
-    ).first()
-    if existing:
-        raise HTTPException(status_code=409, detail="Playlist already monitored")
-    
-    token = get_valid_token(session)
+# ---------------------------------------------------------------------------
+# Background jobs
+#
+# Fetching a playlist can take 100+ Spotify requests (and a token refresh), so
+# adding and syncing run as jobs on a small executor. The routes only validate
+# and return a job id; a few big playlists can't tie up the request threadpool.
+# ---------------------------------------------------------------------------
+
+_playlist_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="playlist-job")
+
+_adding_lock = threading.Lock()
+_adding: set[str] = set()  # Spotify playlist ids with an add job in flight
+
+
+def _spotify_client() -> Spotify:
+    with Session(engine) as session:
+        token = get_valid_token(session)
     if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated with Spotify. Please login first.")
-    
-    from spotipy import Spotify
-    sp = Spotify(auth=token)
-    
-    try:
-        info = fetch_playlist_info(sp, body.url)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch playlist: {str(e)}")
-    
-    playlist = MonitoredPlaylist(
-        spotify_id=playlist_id,
-        name=info.name,
-        url=body.url,
-        track_count=len(info.tracks),
-        last_synced_at=datetime.now(timezone.utc),
-    )
-    session.add(playlist)
-    
+        raise PermissionError("Not authenticated with Spotify. Please login first.")
+    return spotify_client(token)
+
+
+def _progress_reporter(job_id: str):
+    def report(fetched: int, total: int) -> None:
+        update_job(job_id, processed=fetched, progress=min(fetched / total, 0.99) if total else None)
+    return report
+
+
+def _queue_tracks(session: Session, tracks: list[PlaylistTrack]) -> int:
     existing_track_ids = set(
-        sid for sid in session.exec(
-            select(Track.spotify_id).where(Track.spotify_id.is_not(None))
-        ).all()
+        session.exec(select(Track.spotify_id).where(Track.spotify_id.is_not(None))).all()
     )
-    
     new_count = 0
-    for track in info.tracks:
+    for track in tracks:
         if track.spotify_id and track.spotify_id in existing_track_ids:
             continue
         if track.spotify_id:
             existing_track_ids.add(track.spotify_id)
-        
-        db_track = Track(
+        session.add(Track(
             spotify_id=track.spotify_id or None,
             title=track.title,
             artist=track.artist,
             album=track.album,
+            duration_ms=track.duration_ms,
+            isrc=track.isrc,
             status="queued",
             source="playlist",
-        )
-        session.add(db_track)
+        ))
         new_count += 1
-    
-    session.commit()
-    session.refresh(playlist)
+    return new_count
+
+
+def _run_add_playlist(job_id: str, url: str, playlist_id: str) -> dict:
+    try:
+        sp = _spotify_client()
+        try:
+            info = fetch_playlist_info(sp, url, progress_fn=_progress_reporter(job_id))
+        except Exception as e:
+            raise RuntimeError(f"Failed to fetch playlist: {e}") from e
+
+        with write_session() as session:
+            playlist = MonitoredPlaylist(
+                spotify_id=playlist_id,
+                name=info.name,
+                url=url,
+                track_count=len(info.tracks),
+                snapshot_id=info.snapshot_id,
+                last_synced_at=datetime.now(timezone.utc),
+            )
+            session.add(playlist)
+            new_count = _queue_tracks(session, info.tracks)
+            session.commit()
+            session.refresh(playlist)
+            result = PlaylistResponse.model_validate(playlist, from_attributes=True).model_dump()
+    finally:
+        with _adding_lock:
+            _adding.discard(playlist_id)
+
+    if new_count:
+        notify_queued()
     print(f"[playlists] Added playlist '{info.name}' with {new_count} new tracks", flush=True)
-    return playlist
+    return result
+
+
+def _run_sync_playlist(job_id: str, playlist_id: int) -> dict:
+    with Session(engine) as session:
+        playlist = session.get(MonitoredPlaylist, playlist_id)
+        if not playlist:
+            raise LookupError("Playlist not found")
+        try:
+            sp = _spotify_client()
+        except PermissionError as e:
+            return SyncResult(playlist_id=playlist_id, new_tracks=0, total_tracks=0, error=str(e)).model_dump()
+
+        try:
+            info = fetch_playlist_info(sp, playlist.url, playlist.snapshot_id, _progress_reporter(job_id))
+            playlist.name = info.name
+            if not info.unchanged:
+                playlist.track_count = len(info.tracks)
+            playlist.snapshot_id = info.snapshot_id
+            playlist.last_synced_at = datetime.now(timezone.utc)
+            playlist.sync_error = None
+
+            with write_lock:
+                # Tracks without a Spotify id (local files) can't be told apart on a re-sync
+                new_count = _queue_tracks(session, [t for t in info.tracks if t.spotify_id])
+                session.add(playlist)
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            playlist.sync_error = str(e)
+            playlist.last_synced_at = datetime.now(timezone.utc)
+            with write_lock:
+                session.add(playlist)
+                session.commit()
+            return SyncResult(playlist_id=playlist_id, new_tracks=0, total_tracks=0, error=str(e)).model_dump()
+
+        if new_count:
+            notify_queued()
+        print(f"[playlists] Synced '{info.name}': {new_count} new tracks", flush=True)
+        return SyncResult(
+            playlist_id=playlist_id,
+            new_tracks=new_count,
+            total_tracks=playlist.track_count,
+        ).model_dump()
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+@router.post("/playlists", status_code=202)
+def add_playlist(body: PlaylistCreate, session: Session = Depends(get_session)):
+    playlist_id = extract_playlist_id(body.url)
+    if not playlist_id:
+        raise HTTPException(status_code=400, detail="Invalid Spotify playlist URL")
+    
+    existing = session.exec(
+        select(MonitoredPlaylist).where(MonitoredPlaylist.spotify_id == playlist_id)
+    ).first()
+    if existing:
+        raise HTTPException(status_code=409, detail="Playlist already monitored")
+    
+    # Only check that a login exists; a token refresh would be a network call
+    if not session.exec(select(SpotifyOAuth)).first():
+        raise HTTPException(status_code=401, detail="Not authenticated with Spotify. Please login first.")
+    
+    with _adding_lock:
+        if playlist_id in _adding:
+            raise HTTPException(status_code=409, detail="Playlist is already being added")
+        _adding.add(playlist_id)
+    
+    job = start_job("playlist_add", _run_add_playlist, body.url, playlist_id, executor=_playlist_executor)
+    return {"ok": True, "job_id": job.id}
 
 
 @router.delete("/playlists/{playlist_id}")
@@ -120,65 +218,10 @@ def delete_playlist(playlist_id: int, session: Session = Depends(get_session)):
     return {"ok": True}
 
 
-@router.post("/playlists/{playlist_id}/sync", response_model=SyncResult)
+@router.post("/playlists/{playlist_id}/sync", status_code=202)
 def sync_playlist_endpoint(playlist_id: int, session: Session = Depends(get_session)):
-    playlist = session.get(MonitoredPlaylist, playlist_id)
-    if not playlist:
+    if not session.get(MonitoredPlaylist, playlist_id):
         raise HTTPException(status_code=404, detail="Playlist not found")
     
-    token = get_valid_token(session)
-    if not token:
-        return SyncResult(
-            playlist_id=playlist_id,
-            new_tracks=0,
-            total_tracks=0,
-            error="Not authenticated with Spotify. Please login first.",
-        )
-    
-    from spotipy import Spotify
-    sp = Spotify(auth=token)
-    
-    existing_track_ids = set(
-        sid for sid in session.exec(
-            select(Track.spotify_id).where(Track.spotify_id.is_not(None))
-        ).all()
-    )
-    
-    try:
-        new_tracks, info = sync_playlist(sp, playlist.url, existing_track_ids)
-        playlist.name = info.name
-        playlist.track_count = len(info.tracks)
-        playlist.last_synced_at = datetime.now(timezone.utc)
-        playlist.sync_error = None
-        
-        for track in new_tracks:
-            db_track = Track(
-                spotify_id=track.spotify_id or None,
-                title=track.title,
-                artist=track.artist,
-                album=track.album,
-                status="queued",
-                source="playlist",
-            )
-            session.add(db_track)
-        
-        session.add(playlist)
-        session.commit()
-        
-        print(f"[playlists] Synced '{info.name}': {len(new_tracks)} new tracks", flush=True)
-        return SyncResult(
-            playlist_id=playlist_id,
-            new_tracks=len(new_tracks),
-            total_tracks=len(info.tracks),
-        )
-    except Exception as e:
-        playlist.sync_error = str(e)
-        playlist.last_synced_at = datetime.now(timezone.utc)
-        session.add(playlist)
-        session.commit()
-        return SyncResult(
-            playlist_id=playlist_id,
-            new_tracks=0,
-            total_tracks=0,
-            error=str(e),
-        )
+    job = start_job("playlist_sync", _run_sync_playlist, playlist_id, executor=_playlist_executor)
+    return {"ok": True, "job_id": job.id}
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from sqlmodel import Session
 
 from ..database import Track, get_session
+from ..scheduler import notify_queued
 
 router = APIRouter()
 
@@ -35,4 +36,5 @@ def create_request(body: RequestBody, session: Session = Depends(get_session)):
     session.add(track)
     session.commit()
     session.refresh(track)
+    notify_queued()
     return track
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlmodel import Session
 from typing import Optional
 
+from .. import pipeline
 from ..database import Settings, get_session, get_settings
+from ..downloader import OUTPUT_FORMATS
 
 router = APIRouter()
 
@@ -15,6 +17,11 @@ class SettingsUpdate(BaseModel):
     file_template: Optional[str] = None
     sleep_between_downloads: Optional[int] = None
     max_retries: Optional[int] = None
+    search_workers: Optional[int] = None
+    download_workers: Optional[int] = None
+    transcode_workers: Optional[int] = None
+    fingerprint_dedup: Optional[bool] = None
+    output_format: Optional[str] = None
 
 
 @router.get("/settings")
@@ -31,11 +38,25 @@ def update_settings(body: SettingsUpdate, session: Session = Depends(get_session
     if body.file_template is not None:
         settings.file_template = body.file_template
     if body.sleep_between_downloads is not None:
-        settings.sleep_between_downloads = body.sleep_between_downloads
+        settings.sleep_between_downloads = max(0, body.sleep_between_downloads)
     if body.max_retries is not None:
         settings.max_retries = body.max_retries
+    if body.search_workers is not None:
+        settings.search_workers = max(1, body.search_workers)
+    if body.download_workers is not None:
+        settings.download_workers = max(1, body.download_workers)
+    if body.transcode_workers is not None:
+        settings.transcode_workers = max(1, body.transcode_workers)
+    if body.fingerprint_dedup is not None:
+        settings.fingerprint_dedup = body.fingerprint_dedup
+    if body.output_format is not None:
+        if body.output_format not in OUTPUT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}")
+        settings.output_format = body.output_format
 
     session.add(settings)
     session.commit()
     session.refresh(settings)
+    # Apply new stage concurrency now rather than at the next download_worker tick
+    pipeline.ensure_workers(settings)
     return settings
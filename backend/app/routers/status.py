@@ -1,35 +1,29 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, func, select
+from fastapi import APIRouter
 
-from ..database import Track, get_session
+from ..database import get_status_counts
+from .. import library, ratelimit, search_cache, transcode, watcher
+from ..downloader import get_ydl_stats
 from ..scheduler import get_current_state
 
 router = APIRouter()
 
-
 @router.get("/status")
-def get_status(session: Session = Depends(get_session)):
+def get_status():
     state = get_current_state()
-
-    total_done = session.exec(
-        select(func.count()).where(Track.status == "done")
-    ).one()
-    total_failed = session.exec(
-        select(func.count()).where(Track.status == "failed")
-    ).one()
-    queue_length = session.exec(
-        select(func.count()).where(Track.status == "queued")
-    ).one()
-    total_skipped = session.exec(
-        select(func.count()).where(Track.status == "skipped")
-    ).one()
+    counts = get_status_counts()
 
     return {
         **state,
-        "total_done": total_done,
-        "total_failed": total_failed,
-        "total_skipped": total_skipped,
-        "queue_length": queue_length,
+        "total_done": counts.get("done", 0),
+        "total_failed": counts.get("failed", 0),
+        "total_skipped": counts.get("skipped", 0),
+        "queue_length": counts.get("queued", 0),
+        "search_cache": search_cache.get_stats(),
+        "ydl_pool": get_ydl_stats(),
+        "rate_limit": ratelimit.get_state(),
+        "transcode": transcode.get_stats(),
+        "library_scan": library.get_stats(),
+        "library_watch": watcher.get_state(),
     }
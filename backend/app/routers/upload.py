@@ -2,20 +2,30 @@ from __future__ import annotations
 
 import os
 import shutil
-import subprocess
+import tarfile
 import tempfile
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 from pydantic import BaseModel
 from sqlmodel import Session
 from typing import Optional
 
-from ..database import get_session, get_settings
+from .. import fingerprint, transcode
+from ..database import Settings, engine, get_settings
+from ..library import index_file, read_tags
 from ..downloader import sanitize_filename, _set_metadata
+from ..jobs import start_job, update_job
 
 router = APIRouter()
 
 OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "/music")
 
+_CHUNK_SIZE = 1024 * 1024
+
 ACCEPTED_MIME_TYPES = {
     "audio/mpeg",
     "audio/mp3",
@@ -42,30 +52,124 @@ ACCEPTED_EXTENSIONS = {".mp3", ".wav", ".flac", ".m4a", ".ogg", ".wma", ".aac",
 class UploadResponse(BaseModel):
     ok: bool
     file_path: str
+    job_id: Optional[str] = None
     message: Optional[str] = None
 
 
-def _convert_to_mp3(input_path: str, output_path: str, quality: str) -> None:
-    cmd = [
-        "ffmpeg",
-        "-i", input_path,
-        "-codec:a", "libmp3lame",
-        "-b:a", f"{quality}k",
-        "-y",
-        output_path,
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"FFmpeg conversion failed: {result.stderr}")
+def _read_settings() -> Settings:
+    """
+    Settings for an upload, without holding a pooled connection for the request.
+
+    A request-scoped session keeps its connection until the response is sent,
+    so a burst of large uploads being copied to disk could drain the pool and
+    stall the download pipeline.
+    """
+    with Session(engine) as session:
+        return get_settings(session)
+
+
+# ---------------------------------------------------------------------------
+# Storing converted files
+#
+# Conversions write to a "_tmp_" file next to the destination, which the
+# library index ignores, and are hard-linked into place once tagged: the link
+# fails instead of overwriting when the name was taken in the meantime, and a
+# crash mid-conversion leaves no half-written or empty file under the real
+# name. Single uploads still converting hold their name in _in_flight so a
+# second upload with the same tags gets a 409 right away.
+# ---------------------------------------------------------------------------
+
+_in_flight_lock = threading.Lock()
+_in_flight: set[str] = set()
+
+
+def _claim_name(final_path: str) -> bool:
+    with _in_flight_lock:
+        if final_path in _in_flight or os.path.exists(final_path):
+            return False
+        _in_flight.add(final_path)
+        return True
+
+
+def _release_name(final_path: str) -> None:
+    with _in_flight_lock:
+        _in_flight.discard(final_path)
+
+
+def _store_mp3(
+    src: str,
+    final_path: str,
+    quality: str,
+    title: str,
+    artist: Optional[str],
+    album: Optional[str],
+    *,
+    move: bool,
+) -> bool:
+    """Convert (or copy/move an MP3) *src*, tag it and put it at *final_path*. False if that name is taken."""
+    temp = os.path.join(os.path.dirname(final_path), f"_tmp_{uuid.uuid4().hex}.mp3")
+    try:
+        if src.lower().endswith(".mp3"):
+            (shutil.move if move else shutil.copyfile)(src, temp)
+        else:
+            transcode.convert_to_mp3(src, temp, quality, priority=transcode.INTERACTIVE)
+        _set_metadata(temp, title, artist, album)
+        try:
+            os.link(temp, final_path)
+        except FileExistsError:
+            return False
+        except OSError:
+            # No hard links on this file system (e.g. some network shares)
+            if os.path.exists(final_path):
+                return False
+            os.rename(temp, final_path)
+        return True
+    finally:
+        if os.path.exists(temp):
+            os.unlink(temp)
+
+
+# ---------------------------------------------------------------------------
+# Single upload
+# ---------------------------------------------------------------------------
+
+def _process_upload(
+    job_id: str,
+    tmp_path: str,
+    final_path: str,
+    quality: str,
+    title: str,
+    artist: str,
+    album: Optional[str],
+    check_duplicates: bool = False,
+) -> dict:
+    try:
+        stored = _store_mp3(tmp_path, final_path, quality, title, artist, album, move=True)
+    except Exception as e:
+        raise RuntimeError(f"Failed to process file: {e}") from e
+    finally:
+        _release_name(final_path)
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    if not stored:
+        raise RuntimeError(f"File already exists: {os.path.basename(final_path)}")
+    index_file(final_path)
+
+    # Uploads are the user's explicit choice — a matching recording is reported, not removed
+    duplicate = fingerprint.check_file(final_path) if check_duplicates else None
+    if duplicate:
+        message = f"File uploaded — same recording as {os.path.basename(duplicate)}"
+    else:
+        message = "File uploaded successfully"
+    return {"ok": True, "file_path": final_path, "message": message, "duplicate_of": duplicate}
 
 
-@router.post("/upload", response_model=UploadResponse)
+@router.post("/upload", response_model=UploadResponse, status_code=202)
 async def upload_file(
     file: UploadFile = File(...),
     title: str = Form(...),
     artist: str = Form(...),
     album: Optional[str] = Form(None),
-    session: Session = Depends(get_session),
 ):
     ext = os.path.splitext(file.filename or "")[1].lower()
     if ext not in ACCEPTED_EXTENSIONS:
@@ -81,42 +185,203 @@ async def upload_file(
                 detail=f"Invalid MIME type: {file.content_type}",
             )
 
-    settings = get_settings(session)
+    settings = _read_settings()
     file_name = sanitize_filename(settings.file_template, title, artist, album or "")
     if not file_name:
         raise HTTPException(status_code=400, detail="Empty filename after sanitization")
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     final_path = os.path.join(OUTPUT_DIR, f"{file_name}.mp3")
-    
-    if os.path.exists(final_path):
+
+    if not _claim_name(final_path):
         raise HTTPException(status_code=409, detail=f"File already exists: {file_name}.mp3")
 
+    # Stream the upload to disk in chunks instead of reading it into memory
     with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
         try:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
+            while chunk := await file.read(_CHUNK_SIZE):
+                tmp_file.write(chunk)
             tmp_path = tmp_file.name
         except Exception as e:
             os.unlink(tmp_file.name)
+            _release_name(final_path)
             raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {str(e)}")
 
+    # FFmpeg runs on the shared transcode service, never on the event loop
+    job = start_job(
+        "upload",
+        _process_upload,
+        tmp_path,
+        final_path,
+        settings.quality,
+        title,
+        artist,
+        album,
+        settings.fingerprint_dedup and fingerprint.available(),
+    )
+    return UploadResponse(ok=True, file_path=final_path, job_id=job.id, message="Upload received, converting")
+
+
+# ---------------------------------------------------------------------------
+# Bulk upload (many files or a ZIP/TAR archive)
+# ---------------------------------------------------------------------------
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Enough importers to keep every transcode worker busy; FFmpeg itself is bounded by the transcode service
+_import_executor = ThreadPoolExecutor(max_workers=transcode.WORKERS * 2, thread_name_prefix="bulk-import")
+
+
+def _import_audio_file(
+    src: str,
+    original_name: str,
+    template: str,
+    quality: str,
+) -> tuple[str, Optional[str], Optional[str]]:
+    """
+    Tag-read, convert and tag one file. Runs on the bulk import executor.
+
+    Returns (status, file_path, error) where status is imported | skipped | failed.
+    """
+    title, artist, album = read_tags(src, original_name)
+    file_name = sanitize_filename(template, title, artist or "", album or "")
+    if not file_name:
+        return "failed", None, f"{original_name}: empty filename after sanitization"
+
+    final_path = os.path.join(OUTPUT_DIR, f"{file_name}.mp3")
+    if os.path.exists(final_path):
+        return "skipped", final_path, None
+
     try:
-        if ext == ".mp3":
-            shutil.copy2(tmp_path, final_path)
-        else:
-            _convert_to_mp3(tmp_path, final_path, settings.quality)
-        
-        _set_metadata(final_path, title, artist, album)
-        
-        return UploadResponse(ok=True, file_path=final_path, message="File uploaded successfully")
-    
+        # Two files with the same tags: the link makes sure only the first one is stored
+        stored = _store_mp3(src, final_path, quality, title, artist, album, move=False)
     except Exception as e:
-        if os.path.exists(final_path):
-            os.unlink(final_path)
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
-    
+        return "failed", None, f"{original_name}: {e}"
+    if not stored:
+        return "skipped", final_path, None
+    return "imported", final_path, None
+
+
+def _extract_archive(archive_path: str, dest_dir: str) -> list[tuple[str, str]]:
+    """
+    Extract the audio members of a ZIP/TAR archive into *dest_dir*.
+
+    Member paths are flattened (never joined onto dest_dir) so a crafted
+    archive can't write outside it. Returns (path, original_name) pairs.
+    """
+    extracted = []
+
+    def target(name: str) -> str:
+        return os.path.join(dest_dir, f"{len(extracted)}_{os.path.basename(name)}")
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or os.path.splitext(info.filename)[1].lower() not in ACCEPTED_EXTENSIONS:
+                    continue
+                path = target(info.filename)
+                with zf.open(info) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+                extracted.append((path, info.filename))
+    else:
+        with tarfile.open(archive_path) as tf:
+            for member in tf:
+                if not member.isfile() or os.path.splitext(member.name)[1].lower() not in ACCEPTED_EXTENSIONS:
+                    continue
+                src = tf.extractfile(member)
+                if src is None:
+                    continue
+                path = target(member.name)
+                with src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+                extracted.append((path, member.name))
+    return extracted
+
+
+def _process_bulk_upload(
+    job_id: str,
+    work_dir: str,
+    uploads: list[tuple[str, str]],
+    template: str,
+    quality: str,
+    check_duplicates: bool = False,
+) -> dict:
+    try:
+        files: list[tuple[str, str]] = []
+        for path, name in uploads:
+            if name.lower().endswith(ARCHIVE_EXTENSIONS):
+                files.extend(_extract_archive(path, work_dir))
+                os.unlink(path)
+            else:
+                files.append((path, name))
+
+        if not files:
+            raise ValueError("No audio files found in upload.")
+
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        futures = [_import_executor.submit(_import_audio_file, path, name, template, quality) for path, name in files]
+
+        counts = {"imported": 0, "skipped": 0, "failed": 0}
+        errors = []
+        duplicates = []
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                status, file_path, error = future.result()
+            except Exception as e:
+                status, file_path, error = "failed", None, str(e)
+            counts[status] += 1
+            if status == "imported":
+                index_file(file_path)
+                duplicate = fingerprint.check_file(file_path) if check_duplicates else None
+                if duplicate:
+                    duplicates.append(f"{os.path.basename(file_path)}: same recording as {os.path.basename(duplicate)}")
+            if error:
+                errors.append(error)
+            update_job(job_id, processed=done, progress=done / len(futures))
     finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"[upload] Bulk upload finished: {counts['imported']} imported, "
+        f"{counts['skipped']} skipped, {counts['failed']} failed",
+        flush=True,
+    )
+    return {"ok": True, "total": len(files), **counts, "errors": errors[:50], "duplicates": duplicates[:50]}
+
+
+@router.post("/upload/bulk", status_code=202)
+async def upload_bulk(
+    files: list[UploadFile] = File(..., description="Audio files and/or ZIP/TAR archives"),
+):
+    for file in files:
+        name = (file.filename or "").lower()
+        if not name.endswith(ARCHIVE_EXTENSIONS) and os.path.splitext(name)[1] not in ACCEPTED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file type: {file.filename}. Accepted: audio files or ZIP/TAR archives",
+            )
+
+    settings = _read_settings()
+    work_dir = tempfile.mkdtemp(prefix="sonus_bulk_")
+    uploads = []
+    try:
+        for i, file in enumerate(files):
+            path = os.path.join(work_dir, f"upload_{i}_{os.path.basename(file.filename or '')}")
+            with open(path, "wb") as out:
+                while chunk := await file.read(_CHUNK_SIZE):
+                    out.write(chunk)
+            uploads.append((path, file.filename or ""))
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Failed to save uploaded files: {e}")
+
+    job = start_job(
+        "bulk_upload",
+        _process_bulk_upload,
+        work_dir,
+        uploads,
+        settings.file_template,
+        settings.quality,
+        settings.fingerprint_dedup and fingerprint.available(),
+    )
+    return {"ok": True, "job_id": job.id, "files": len(uploads)}
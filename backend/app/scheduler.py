@@ -1,121 +1,52 @@
 from __future__ import annotations
 
 import os
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from spotipy import Spotify
 from sqlmodel import Session, select
 
-from .database import MonitoredPlaylist, Settings, SpotifyOAuth, Track, engine, get_settings
-from .downloader import download_track
-from .spotdl_client import sync_playlist
+from . import fingerprint, library, pipeline, watcher
+from .database import MonitoredPlaylist, SpotifyOAuth, Track, engine, get_settings, write_lock
+from .spotdl_client import fetch_playlist_info, spotify_client
 
-# ---------------------------------------------------------------------------
-# State
-# ---------------------------------------------------------------------------
-
-_download_lock = threading.Lock()
-_currently_downloading: Optional[dict] = None  # {track_id, title, artist}
+_PLAYLIST_SYNC_WORKERS = 4
+_LIBRARY_SCAN_MINUTES = int(os.environ.get("LIBRARY_SCAN_MINUTES", "30"))
 
 scheduler = BackgroundScheduler(timezone="UTC")
 
 
 def get_current_state() -> dict:
-    return {
-        "currently_downloading": _currently_downloading,
-    }
+    return pipeline.get_state()
 
 
 # ---------------------------------------------------------------------------
-# Download worker — drains queue one track at a time
+# Download worker — keeps the pipeline stages staffed and looking for work.
+# Routers wake the pipeline directly; the interval job is only a safety net.
 # ---------------------------------------------------------------------------
 
 def download_worker() -> None:
-    global _currently_downloading
-
-    if not _download_lock.acquire(blocking=False):
-        return  # another download is already in progress
-
-    try:
-        with Session(engine) as session:
-            track = session.exec(
-                select(Track).where(Track.status == "queued").order_by(Track.requested_at)
-            ).first()
-
-            if not track:
-                return
-
-            settings = get_settings(session)
-            quality = settings.quality
-            template = settings.file_template
-            sleep_sec = settings.sleep_between_downloads
-            max_retries = settings.max_retries
-            output_dir = os.environ.get("OUTPUT_DIR", "/music")
-
-            track.status = "downloading"
-            session.add(track)
-            session.commit()
-            session.refresh(track)
-
-            track_id = track.id
-            track_title = track.title
-            track_artist = track.artist
-            track_album = track.album
-
-        _currently_downloading = {
-            "track_id": track_id,
-            "title": track_title,
-            "artist": track_artist,
-        }
-
-        label = f"{track_artist} - {track_title}" if track_artist else track_title
-        print(f"[downloader] Searching: {label}", flush=True)
-
-        success, file_path, error = download_track(
-            title=track_title,
-            artist=track_artist,
-            album=track_album,
-            output_dir=output_dir,
-            quality=quality,
-            template=template,
-            sleep_sec=sleep_sec,
-            max_retries=max_retries,
-            log_fn=lambda msg: print(f"[downloader] {msg}", flush=True),
-        )
+    with Session(engine) as session:
+        settings = get_settings(session)
+    pipeline.ensure_workers(settings)
+    pipeline.wake()
 
-        with Session(engine) as session:
-            t = session.get(Track, track_id)
-            if t:
-                if success:
-                    t.status = "done"
-                    t.file_path = file_path
-                    t.downloaded_at = datetime.now(timezone.utc)
-                elif file_path:
-                    # file_path returned but success=False means already existed (skipped)
-                    t.status = "skipped"
-                    t.file_path = file_path
-                else:
-                    t.status = "failed"
-                    t.error_msg = error
-                    print(f"[downloader] FAILED: {error}", flush=True)
-                session.add(t)
-                session.commit()
 
-    finally:
-        _currently_downloading = None
-        _download_lock.release()
+def notify_queued() -> None:
+    """Call after committing new queued tracks so the pipeline picks them up immediately."""
+    pipeline.wake()
 
 
 def start_scheduler() -> None:
+    pipeline.start()
     scheduler.add_job(
         download_worker,
         trigger="interval",
-        seconds=15,
+        seconds=60,
         id="worker",
         replace_existing=True,
+        next_run_time=datetime.now(timezone.utc),
     )
     scheduler.add_job(
         playlist_sync_worker,
@@ -124,11 +55,32 @@ def start_scheduler() -> None:
         id="playlist_sync",
         replace_existing=True,
     )
+    if watcher.start():
+        # Live events keep the index current; one scan catches changes made while we were down
+        scheduler.add_job(library.scan_library, id="library_scan", replace_existing=True)
+    else:
+        scheduler.add_job(
+            library.scan_library,
+            trigger="interval",
+            minutes=_LIBRARY_SCAN_MINUTES,
+            id="library_scan",
+            replace_existing=True,
+            next_run_time=datetime.now(timezone.utc),
+        )
+    scheduler.add_job(
+        fingerprint.backfill_library,
+        trigger="interval",
+        minutes=10,
+        id="fingerprint_backfill",
+        replace_existing=True,
+    )
     scheduler.start()
-    print("[scheduler] Started download worker and playlist sync.", flush=True)
+    print("[scheduler] Started download pipeline, playlist sync and library scan.", flush=True)
 
 
 def stop_scheduler() -> None:
+    pipeline.stop()
+    watcher.stop()
     if scheduler.running:
         scheduler.shutdown(wait=False)
 
@@ -163,7 +115,7 @@ def playlist_sync_worker() -> None:
                 print(f"[scheduler] Token refresh failed: {e}", flush=True)
                 return
         
-        sp = Spotify(auth=oauth_record.access_token)
+        sp = spotify_client(oauth_record.access_token)
         
         playlists = session.exec(select(MonitoredPlaylist)).all()
         if not playlists:
@@ -175,35 +127,52 @@ def playlist_sync_worker() -> None:
             ).all()
         )
         
-        for playlist in playlists:
-            try:
-                new_tracks, info = sync_playlist(sp, playlist.url, existing_track_ids)
-                playlist.name = info.name
-                playlist.track_count = len(info.tracks)
-                playlist.last_synced_at = datetime.now(timezone.utc)
-                playlist.sync_error = None
-                
-                for track in new_tracks:
-                    db_track = Track(
-                        spotify_id=track.spotify_id or None,
-                        title=track.title,
-                        artist=track.artist,
-                        album=track.album,
-                        status="queued",
-                        source="playlist",
-                    )
-                    session.add(db_track)
-                    if track.spotify_id:
+        # Spotify requests for all playlists run concurrently; DB writes stay on this thread
+        with ThreadPoolExecutor(max_workers=_PLAYLIST_SYNC_WORKERS) as pool:
+            futures = {
+                playlist.id: pool.submit(fetch_playlist_info, sp, playlist.url, playlist.snapshot_id)
+                for playlist in playlists
+            }
+            
+            for playlist in playlists:
+                try:
+                    info = futures[playlist.id].result()
+                    playlist.name = info.name
+                    if not info.unchanged:
+                        playlist.track_count = len(info.tracks)
+                    playlist.snapshot_id = info.snapshot_id
+                    playlist.last_synced_at = datetime.now(timezone.utc)
+                    playlist.sync_error = None
+                    
+                    new_count = 0
+                    for track in info.tracks:
+                        # Checked per track so a song in several playlists is only queued once
+                        if not track.spotify_id or track.spotify_id in existing_track_ids:
+                            continue
+                        db_track = Track(
+                            spotify_id=track.spotify_id,
+                            title=track.title,
+                            artist=track.artist,
+                            album=track.album,
+                            duration_ms=track.duration_ms,
+                            isrc=track.isrc,
+                            status="queued",
+                            source="playlist",
+                        )
+                        session.add(db_track)
                         existing_track_ids.add(track.spotify_id)
-                
-                session.add(playlist)
-                
-                if new_tracks:
-                    print(f"[scheduler] Synced '{info.name}': {len(new_tracks)} new tracks", flush=True)
-            except Exception as e:
-                playlist.sync_error = str(e)
-                playlist.last_synced_at = datetime.now(timezone.utc)
-                session.add(playlist)
-                print(f"[scheduler] Sync failed for '{playlist.name}': {e}", flush=True)
+                        new_count += 1
+                    
+                    session.add(playlist)
+                    
+                    if new_count:
+                        print(f"[scheduler] Synced '{info.name}': {new_count} new tracks", flush=True)
+                except Exception as e:
+                    playlist.sync_error = str(e)
+                    playlist.last_synced_at = datetime.now(timezone.utc)
+                    session.add(playlist)
+                    print(f"[scheduler] Sync failed for '{playlist.name}': {e}", flush=True)
         
-        session.commit()
+        with write_lock:
+            session.commit()
+    notify_queued()
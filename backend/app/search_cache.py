@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlmodel import Session, col, delete, func, select
+
+from .database import SearchCache, engine
+
+# ---------------------------------------------------------------------------
+# Persistent cache of YouTube search candidates
+#
+# Keyed by the normalised query string; stores the flat yt-dlp entries (not the
+# chosen URL) so callers can still score them against their own tokens.
+# ---------------------------------------------------------------------------
+
+TTL = timedelta(hours=int(os.environ.get("SEARCH_CACHE_TTL_HOURS", "168")))
+MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "20000"))
+
+# Only what scoring and URL building need — flat entries carry a lot more
+_KEEP_FIELDS = ("id", "url", "title", "channel", "uploader", "duration")
+
+_stats_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _count(hit: bool) -> None:
+    global _hits, _misses
+    with _stats_lock:
+        if hit:
+            _hits += 1
+        else:
+            _misses += 1
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        hits, misses = _hits, _misses
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else None,
+    }
+
+
+def lookup(query: str) -> Optional[list[dict]]:
+    """Return cached candidates for *query*, or None on a miss or expired row."""
+    key = normalize_query(query)
+    try:
+        with Session(engine) as session:
+            row = session.get(SearchCache, key)
+            if row is None or row.created_at < datetime.utcnow() - TTL:
+                _count(hit=False)
+                return None
+            row.last_used_at = datetime.utcnow()
+            session.add(row)
+            session.commit()
+            entries = json.loads(row.entries)
+    except Exception as exc:
+        print(f"[search] Cache lookup failed: {exc}", flush=True)
+        return None
+    _count(hit=True)
+    return entries
+
+
+def store(query: str, entries: list[dict]) -> None:
+    """Save candidates for *query* and evict the least recently used rows beyond the cap."""
+    slim = [{k: e.get(k) for k in _KEEP_FIELDS if e.get(k) is not None} for e in entries]
+    now = datetime.utcnow()
+    try:
+        with Session(engine) as session:
+            row = session.get(SearchCache, normalize_query(query))
+            if row is None:
+                row = SearchCache(query_key=normalize_query(query))
+            row.entries = json.dumps(slim)
+            row.created_at = now
+            row.last_used_at = now
+            session.add(row)
+            session.commit()
+
+            size = session.exec(select(func.count()).select_from(SearchCache)).one()
+            if size > MAX_ENTRIES:
+                stale = select(SearchCache.query_key).order_by(SearchCache.last_used_at).limit(size - MAX_ENTRIES)
+                session.exec(delete(SearchCache).where(col(SearchCache.query_key).in_(stale)))
+                session.commit()
+    except Exception as exc:
+        print(f"[search] Cache store failed: {exc}", flush=True)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Optional
 
+import requests
+from requests.adapters import HTTPAdapter
 from spotipy import Spotify
+from spotipy.exceptions import SpotifyException
+from urllib3.util.retry import Retry
 
 
 @dataclass
@@ -15,6 +21,7 @@ class PlaylistTrack:
     artist: Optional[str]
     album: Optional[str]
     duration_ms: Optional[int] = None
+    isrc: Optional[str] = None
 
 
 @dataclass
@@ -22,6 +29,15 @@ class PlaylistInfo:
     spotify_id: str
     name: str
     tracks: list[PlaylistTrack]
+    snapshot_id: Optional[str] = None
+    # True when snapshot_id matched the caller's and the items were not fetched
+    unchanged: bool = False
+
+
+# Only request what PlaylistTrack needs; full track objects are several KB each.
+# Newer API responses nest the track under "item" instead of "track".
+_TRACK_FIELDS = "id,name,duration_ms,artists(name),album(name),external_ids(isrc)"
+_ITEM_FIELDS = f"items(track({_TRACK_FIELDS}),item({_TRACK_FIELDS})),next,total"
 
 
 def extract_playlist_id(url: str) -> Optional[str]:
@@ -37,55 +53,151 @@ def extract_playlist_id(url: str) -> Optional[str]:
     return None
 
 
-def fetch_playlist_info(sp: Spotify, url: str) -> PlaylistInfo:
+# ---------------------------------------------------------------------------
+# Rate-limit aware requests
+# ---------------------------------------------------------------------------
+
+_PAGE_LIMIT = 100
+_PAGE_WORKERS = 4
+_MAX_RATE_LIMIT_RETRIES = 5
+
+_SERVER_ERROR_RETRIES = 3
+
+_gate_lock = threading.Lock()
+_blocked_until = 0.0  # monotonic time before which no thread may call Spotify
+
+
+def _wait_for_gate() -> None:
+    with _gate_lock:
+        delay = _blocked_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _block_for(seconds: float) -> None:
+    global _blocked_until
+    with _gate_lock:
+        _blocked_until = max(_blocked_until, time.monotonic() + seconds)
+
+
+def spotify_client(token: str) -> Spotify:
+    """
+    A Spotify client whose 429 responses reach _call with their Retry-After.
+
+    spotipy's default session sleeps through Retry-After in each request on
+    its own and, once its retries run out, raises without the header, so the
+    shared gate below could not pause the other page fetches for the right
+    time. Server errors are still retried by the session.
+    """
+    retry = Retry(
+        total=_SERVER_ERROR_RETRIES,
+        read=False,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        backoff_factor=0.3,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return Spotify(auth=token, requests_session=session)
+
+
+def _call(fn, *args, **kwargs):
+    """
+    Call a spotipy method, honouring 429 Retry-After across all threads.
+
+    A rate-limited call pauses every other page fetch too, then is retried.
+    """
+    for attempt in range(_MAX_RATE_LIMIT_RETRIES + 1):
+        _wait_for_gate()
+        try:
+            return fn(*args, **kwargs)
+        except SpotifyException as exc:
+            if exc.http_status != 429 or attempt == _MAX_RATE_LIMIT_RETRIES:
+                raise
+            retry_after = float((exc.headers or {}).get("Retry-After") or 1)
+            print(f"[spotify] Rate limited, retrying in {retry_after:.0f}s", flush=True)
+            _block_for(retry_after)
+
+
+def _parse_items(results: dict) -> list[PlaylistTrack]:
+    tracks = []
+    for item in results.get("items", []):
+        track = item.get("track") or item.get("item")
+        if not track or not track.get("id"):
+            continue
+        
+        artists = track.get("artists", [])
+        artist_names = [a.get("name") for a in artists if a.get("name")]
+        
+        tracks.append(PlaylistTrack(
+            spotify_id=track["id"],
+            title=track.get("name", "Unknown"),
+            artist=", ".join(artist_names) if artist_names else None,
+            album=track.get("album", {}).get("name") if track.get("album") else None,
+            duration_ms=track.get("duration_ms"),
+            isrc=(track.get("external_ids") or {}).get("isrc"),
+        ))
+    return tracks
+
+
+def fetch_playlist_info(
+    sp: Spotify,
+    url: str,
+    known_snapshot_id: Optional[str] = None,
+    progress_fn: Optional[Callable[[int, int], None]] = None,
+) -> PlaylistInfo:
+    """
+    Fetch a playlist's name and tracks.
+
+    If the playlist's snapshot_id equals *known_snapshot_id* nothing changed
+    since the last sync, so item paging is skipped and ``unchanged`` is set.
+    The first page reports the total, so the remaining pages are fetched
+    concurrently and reassembled in playlist order. *progress_fn* is called
+    with (items fetched, total items) after every page.
+    """
     playlist_id = extract_playlist_id(url)
     if not playlist_id:
         raise ValueError(f"Invalid Spotify playlist URL: {url}")
     
-    playlist = sp.playlist(playlist_id)
+    playlist = _call(sp.playlist, playlist_id, fields="name,snapshot_id")
     playlist_name = playlist.get("name", "Unknown Playlist")
+    snapshot_id = playlist.get("snapshot_id")
     
-    tracks = []
-    offset = 0
-    limit = 100
-    
-    while True:
-        results = sp.playlist_items(
-            playlist_id,
-            offset=offset,
-            limit=limit
+    if known_snapshot_id and snapshot_id == known_snapshot_id:
+        return PlaylistInfo(
+            spotify_id=playlist_id,
+            name=playlist_name,
+            tracks=[],
+            snapshot_id=snapshot_id,
+            unchanged=True,
         )
-        
-        for item in results.get("items", []):
-            track = item.get("track") or item.get("item")
-            if not track or not track.get("id"):
-                continue
-            
-            artists = track.get("artists", [])
-            artist_names = [a.get("name") for a in artists if a.get("name")]
-            
-            playlist_track = PlaylistTrack(
-                spotify_id=track["id"],
-                title=track.get("name", "Unknown"),
-                artist=", ".join(artist_names) if artist_names else None,
-                album=track.get("album", {}).get("name") if track.get("album") else None,
-                duration_ms=track.get("duration_ms"),
-            )
-            tracks.append(playlist_track)
-        
-        if not results.get("next"):
-            break
-        
-        offset += limit
+    
+    def fetch_page(offset: int) -> dict:
+        return _call(sp.playlist_items, playlist_id, fields=_ITEM_FIELDS, offset=offset, limit=_PAGE_LIMIT)
+    
+    first = fetch_page(0)
+    tracks = _parse_items(first)
+    
+    total = first.get("total") or 0
+    fetched = len(first.get("items") or [])
+    if progress_fn:
+        progress_fn(fetched, total)
+    offsets = list(range(_PAGE_LIMIT, total, _PAGE_LIMIT)) if first.get("next") else []
+    if offsets:
+        with ThreadPoolExecutor(max_workers=_PAGE_WORKERS) as pool:
+            # map() yields in submission order, so tracks keep their playlist position
+            for page in pool.map(fetch_page, offsets):
+                tracks.extend(_parse_items(page))
+                fetched += len(page.get("items") or [])
+                if progress_fn:
+                    progress_fn(fetched, total)
     
     return PlaylistInfo(
         spotify_id=playlist_id,
         name=playlist_name,
         tracks=tracks,
+        snapshot_id=snapshot_id,
     )
-
-
-def sync_playlist(sp: Spotify, url: str, existing_spotify_ids: set[str]) -> tuple[list[PlaylistTrack], PlaylistInfo]:
-    info = fetch_playlist_info(sp, url)
-    new_tracks = [t for t in info.tracks if t.spotify_id and t.spotify_id not in existing_spotify_ids]
-    return new_tracks, info
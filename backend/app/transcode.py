@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+
+from . import metrics
+
+# ---------------------------------------------------------------------------
+# Shared FFmpeg service
+#
+# Every FFmpeg run — pipeline transcodes as well as uploads — goes through one
+# priority queue served by a fixed number of workers, one per available core,
+# so conversions can never oversubscribe the CPU. Interactive work (uploads)
+# is taken before background work (downloads, playlist backfills), and
+# background FFmpeg processes run with lowered CPU and I/O priority so the web
+# UI stays responsive while a large playlist is being processed.
+# ---------------------------------------------------------------------------
+
+INTERACTIVE = 0
+BACKGROUND = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # honours container CPU sets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+WORKERS = int(os.environ.get("TRANSCODE_WORKERS", "0")) or _available_cores()
+
+
+def _background_prefix() -> list[str]:
+    prefix = []
+    if shutil.which("nice"):
+        prefix += ["nice", "-n", "10"]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c", "3", "-t"]  # idle I/O class; -t: run anyway if it can't be set
+    return prefix
+
+
+_BACKGROUND_PREFIX = _background_prefix()
+
+_queue: queue.PriorityQueue = queue.PriorityQueue()
+_seq = itertools.count()  # FIFO within a priority
+_lock = threading.Lock()
+_workers: list[threading.Thread] = []
+_queued = {INTERACTIVE: 0, BACKGROUND: 0}
+_stats = {"running": 0, "completed": 0, "failed": 0, "wait_sec": 0.0, "run_sec": 0.0}
+
+
+def _ensure_workers() -> None:
+    with _lock:
+        while len(_workers) < WORKERS:
+            worker = threading.Thread(target=_work, name=f"transcode-{len(_workers)}", daemon=True)
+            _workers.append(worker)
+            worker.start()
+
+
+def _work() -> None:
+    while True:
+        priority, _, cmd, future, enqueued_at = _queue.get()
+        started = time.monotonic()
+        with _lock:
+            _queued[priority] -= 1
+            _stats["running"] += 1
+            _stats["wait_sec"] += started - enqueued_at
+        metrics.FFMPEG_QUEUE_WAIT_SECONDS.labels(_PRIORITY_NAMES[priority]).observe(started - enqueued_at)
+        ok = False
+        try:
+            if priority == BACKGROUND:
+                cmd = _BACKGROUND_PREFIX + cmd
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            ok = result.returncode == 0
+            future.set_result(result)
+        except Exception as exc:
+            future.set_exception(exc)
+        finally:
+            elapsed = time.monotonic() - started
+            with _lock:
+                _stats["running"] -= 1
+                _stats["completed" if ok else "failed"] += 1
+                _stats["run_sec"] += elapsed
+            metrics.FFMPEG_RUN_SECONDS.labels(_PRIORITY_NAMES[priority]).observe(elapsed)
+
+
+def run(cmd: list[str], *, priority: int = BACKGROUND) -> subprocess.CompletedProcess:
+    """Queue *cmd* and block until a worker has run it."""
+    _ensure_workers()
+    future: Future = Future()
+    with _lock:
+        _queued[priority] += 1
+    _queue.put((priority, next(_seq), cmd, future, time.monotonic()))
+    return future.result()
+
+
+def get_stats() -> dict:
+    with _lock:
+        finished = _stats["completed"] + _stats["failed"]
+        return {
+            "workers": WORKERS,
+            "running": _stats["running"],
+            "queued": {_PRIORITY_NAMES[p]: n for p, n in _queued.items()},
+            "completed": _stats["completed"],
+            "failed": _stats["failed"],
+            "avg_wait_sec": round(_stats["wait_sec"] / finished, 2) if finished else None,
+            "avg_run_sec": round(_stats["run_sec"] / finished, 2) if finished else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# FFmpeg commands
+# ---------------------------------------------------------------------------
+
+def convert_to_mp3(input_path: str, output_path: str, quality: str, *, priority: int = BACKGROUND) -> None:
+    cmd = [
+        "ffmpeg",
+        "-i", input_path,
+        "-vn",
+        "-codec:a", "libmp3lame",
+        "-b:a", f"{quality}k",
+        "-y",
+        output_path,
+    ]
+    result = run(cmd, priority=priority)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg conversion failed: {result.stderr}")
+
+
+def remux_audio(input_path: str, output_path: str, *, priority: int = BACKGROUND) -> None:
+    """Copy the audio stream into the container implied by *output_path*'s extension."""
+    cmd = ["ffmpeg", "-i", input_path, "-vn", "-codec:a", "copy", "-y", output_path]
+    result = run(cmd, priority=priority)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg remux failed: {result.stderr[-300:]}")
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlmodel import col, select, update
+
+from . import library
+from .database import Track, write_session
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+except ImportError:  # optional — without it the periodic library scan is the only source
+    FileSystemEventHandler = object
+    Observer = PollingObserver = None
+
+# ---------------------------------------------------------------------------
+# Music folder watcher
+#
+# Feeds file system events into the library index so changes made by other
+# tools show up without a full rescan. Events are only collected here; a
+# debounce thread applies them once the folder has been quiet for a moment,
+# so a bulk copy of thousands of files becomes a few batched transactions.
+#
+# LIBRARY_WATCH=auto (default) uses inotify and falls back to polling if it
+# can't be set up, "poll" forces polling (network shares often don't deliver
+# inotify events) and "off" disables the watcher.
+# ---------------------------------------------------------------------------
+
+WATCH_MODE = os.environ.get("LIBRARY_WATCH", "auto").lower()
+
+_DEBOUNCE_SEC = 2.0  # apply once no event arrived for this long...
+_MAX_DELAY_SEC = 10.0  # ...but never hold events back longer than this during a burst
+_POLL_INTERVAL_SEC = 30
+_BATCH_SIZE = 500
+
+_pending_lock = threading.Lock()
+_pending: set[str] = set()
+_first_event_at: Optional[float] = None
+_last_event_at = 0.0
+_flush_wanted = threading.Event()
+_stopping = threading.Event()
+
+_observer = None
+_flusher: Optional[threading.Thread] = None
+_mode: Optional[str] = None
+
+
+def _log(msg: str) -> None:
+    print(f"[watcher] {msg}", flush=True)
+
+
+def get_state() -> dict:
+    with _pending_lock:
+        pending = len(_pending)
+    return {"mode": _mode, "pending": pending}
+
+
+class _Handler(FileSystemEventHandler):
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        if event.is_directory and event.event_type == "modified":
+            # Sent for the parent of every file event; the file's own event covers the change
+            return
+        paths = [event.src_path]
+        if event.event_type == "moved":
+            paths.append(event.dest_path)
+        if not event.is_directory:
+            paths = [p for p in paths if library.is_library_file(p)]
+        if paths:
+            _enqueue(paths)
+
+
+def _enqueue(paths: list[str]) -> None:
+    global _first_event_at, _last_event_at
+    now = time.monotonic()
+    with _pending_lock:
+        _pending.update(os.fsdecode(p) for p in paths)
+        if _first_event_at is None:
+            _first_event_at = now
+        _last_event_at = now
+    _flush_wanted.set()
+
+
+# ---------------------------------------------------------------------------
+# Applying changes
+# ---------------------------------------------------------------------------
+
+def _mark_tracks(added: list[dict], removed: list[str]) -> None:
+    """
+    Reflect library changes on Track rows.
+
+    Deleted files mark their done/skipped tracks as ``missing``; a file that
+    (re)appears restores missing tracks at that path and satisfies queued or
+    failed tracks for the same song.
+    """
+    added_paths = {row["dedup_key"]: os.path.join(library.OUTPUT_DIR, row["path"]) for row in added}
+    present = set(added_paths.values())
+    gone = [p for p in removed if p not in present]
+    present = list(present)
+    keys = [k for k in added_paths if k]
+
+    with write_session() as session:
+        for i in range(0, len(gone), _BATCH_SIZE):
+            session.exec(
+                update(Track)
+                .where(col(Track.file_path).in_(gone[i : i + _BATCH_SIZE]), col(Track.status).in_(["done", "skipped"]))
+                .values(status="missing")
+            )
+        for i in range(0, len(present), _BATCH_SIZE):
+            session.exec(
+                update(Track)
+                .where(col(Track.file_path).in_(present[i : i + _BATCH_SIZE]), Track.status == "missing")
+                .values(status="done")
+            )
+
+        satisfied = []
+        for i in range(0, len(keys), _BATCH_SIZE):
+            satisfied += session.exec(
+                select(Track.id, Track.dedup_key)
+                .where(col(Track.dedup_key).in_(keys[i : i + _BATCH_SIZE]), col(Track.status).in_(["queued", "failed"]))
+            ).all()
+        if satisfied:
+            session.exec(
+                update(Track),
+                params=[
+                    {"id": id_, "status": "skipped", "file_path": added_paths[key], "error_msg": None}
+                    for id_, key in satisfied
+                ],
+            )
+        session.commit()
+
+
+def _apply(paths: set[str]) -> None:
+    to_index: set[str] = set()
+    removed: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            to_index.update(library.walk_files(path))
+        elif os.path.isfile(path):
+            to_index.add(path)
+        else:
+            removed.extend(library.remove_paths(path))
+
+    added = library.index_files(sorted(to_index), skip_unchanged=True)
+    _mark_tracks(added, removed)
+    if added or removed:
+        _log(f"Applied {len(added)} new/changed and {len(removed)} removed files")
+
+
+def _flush_loop() -> None:
+    global _first_event_at
+    while not _stopping.is_set():
+        _flush_wanted.wait(timeout=1)
+        with _pending_lock:
+            if not _pending:
+                _flush_wanted.clear()
+                continue
+            now = time.monotonic()
+            if now - _last_event_at < _DEBOUNCE_SEC and now - _first_event_at < _MAX_DELAY_SEC:
+                ready = None
+            else:
+                ready = set(_pending)
+                _pending.clear()
+                _first_event_at = None
+                _flush_wanted.clear()
+        if ready is None:
+            _stopping.wait(0.5)
+            continue
+        try:
+            _apply(ready)
+        except Exception as exc:
+            _log(f"Failed to apply changes: {exc}")
+
+
+# ---------------------------------------------------------------------------
+# Control
+# ---------------------------------------------------------------------------
+
+def _start_observer(polling: bool):
+    observer = PollingObserver(timeout=_POLL_INTERVAL_SEC) if polling else Observer()
+    observer.schedule(_Handler(), library.OUTPUT_DIR, recursive=True)
+    observer.start()
+    return observer
+
+
+def start() -> bool:
+    """Start watching OUTPUT_DIR. Returns False if no watcher is running (disabled or unavailable)."""
+    global _observer, _flusher, _mode
+    if WATCH_MODE == "off":
+        return False
+    if Observer is None:
+        _log("watchdog is not installed — relying on periodic library scans")
+        return False
+    if not os.path.isdir(library.OUTPUT_DIR):
+        _log(f"{library.OUTPUT_DIR} does not exist — not watching")
+        return False
+
+    _stopping.clear()
+    try:
+        _observer = _start_observer(polling=WATCH_MODE == "poll")
+        _mode = "poll" if WATCH_MODE == "poll" else "native"
+    except OSError as exc:
+        # e.g. fs.inotify.max_user_watches exhausted on a large library
+        _log(f"Native file watching unavailable ({exc}) — falling back to polling")
+        _observer = _start_observer(polling=True)
+        _mode = "poll"
+
+    _flusher = threading.Thread(target=_flush_loop, name="library-watcher", daemon=True)
+    _flusher.start()
+    _log(f"Watching {library.OUTPUT_DIR} ({_mode})")
+    return True
+
+
+def stop() -> None:
+    global _observer
+    _stopping.set()
+    _flush_wanted.set()
+    if _observer is not None:
+        _observer.stop()
+        _observer = None
@@ -0,0 +1,108 @@
+"""
+CSV import time for a large playlist export into a populated database.
+
+Seeds a throwaway database with existing tracks, writes an Exportify-style
+CSV and runs the import job (routers.import_csv._run_import) on it. A third
+of the rows match existing tracks by Spotify id, a third by artist + title
+under a different id, and the rest are new — including rows repeated within
+the file.
+
+Run from backend/:
+
+    python bench/csv_import.py [--tracks 50000] [--rows 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+_WORKDIR = tempfile.mkdtemp(prefix="csv-import-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_WORKDIR, "db.sqlite"))
+os.environ.setdefault("OUTPUT_DIR", os.path.join(_WORKDIR, "music"))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, func, select  # noqa: E402
+
+from app.database import Track, create_db_and_tables, engine, make_dedup_key  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.routers.import_csv import _run_import  # noqa: E402
+
+_SEED_BATCH = 5000
+
+
+def _track(i: int) -> dict:
+    return {
+        "spotify_id": f"{i:022d}",
+        "title": f"Song Number {i}",
+        "artist": f"Artist {i % 997}",
+        "album": f"Album {i % 3001}",
+        "duration_ms": 180000 + i % 60000,
+    }
+
+
+def seed(count: int) -> None:
+    rows = []
+    for i in range(count):
+        row = _track(i)
+        rows.append({**row, "dedup_key": make_dedup_key(row["artist"], row["title"]), "status": "done"})
+    with Session(engine) as session:
+        for start in range(0, len(rows), _SEED_BATCH):
+            session.exec(insert(Track), params=rows[start : start + _SEED_BATCH])
+        session.commit()
+
+
+def write_csv(path: str, rows: int, existing: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Track URI", "Track Name", "Artist Name(s)", "Album Name", "Duration (ms)"])
+        for n in range(rows):
+            kind = n % 3
+            if kind == 0:  # same Spotify id as an existing track
+                track = _track(n * 7 % existing)
+            elif kind == 1:  # same song under another id
+                track = {**_track(n * 11 % existing), "spotify_id": f"x{n:021d}"}
+            else:  # new; every tenth one repeats an earlier row of the file
+                track = _track(existing + (n - 3 if n % 10 == 2 and n >= 3 else n))
+            writer.writerow([
+                f"spotify:track:{track['spotify_id']}",
+                track["title"],
+                track["artist"],
+                track["album"],
+                track["duration_ms"],
+            ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=50_000, help="tracks already in the database")
+    parser.add_argument("--rows", type=int, default=10_000, help="rows in the imported CSV")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    run_migrations()
+    started = time.perf_counter()
+    seed(args.tracks)
+    print(f"Seeded {args.tracks} tracks in {time.perf_counter() - started:.1f}s")
+
+    path = os.path.join(_WORKDIR, "playlist.csv")
+    write_csv(path, args.rows, args.tracks)
+
+    started = time.perf_counter()
+    result = _run_import("bench", path, "utf-8")
+    elapsed = time.perf_counter() - started
+
+    with Session(engine) as session:
+        total = session.exec(select(func.count()).select_from(Track)).one()
+    print(
+        f"Imported {result['total']} rows in {elapsed:.2f}s: "
+        f"{result['imported']} queued, {result['skipped']} skipped, {total} tracks now"
+    )
+
+
+if __name__ == "__main__":
+    main()
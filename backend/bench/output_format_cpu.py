@@ -0,0 +1,85 @@
+"""
+CPU seconds per track for each output format policy.
+
+Generates YouTube-like downloads with ffmpeg — Opus in WebM and AAC in M4A —
+and runs downloader.finalize_audio on each under Settings.output_format
+"mp3" and "native". The CPU time of the FFmpeg child processes is read from
+resource.getrusage(RUSAGE_CHILDREN). Needs ffmpeg on PATH.
+
+Run from backend/:
+
+    python bench/output_format_cpu.py [--seconds 210] [--runs 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+_WORKDIR = tempfile.mkdtemp(prefix="output-format-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_WORKDIR, "db.sqlite"))
+os.environ.setdefault("OUTPUT_DIR", os.path.join(_WORKDIR, "music"))
+
+from app.downloader import OUTPUT_FORMATS, finalize_audio  # noqa: E402
+
+_SOURCES = {
+    "webm": ["-c:a", "libopus", "-b:a", "128k"],
+    "m4a": ["-c:a", "aac", "-b:a", "128k"],
+}
+
+
+def _make_source(path: str, seconds: int, codec_args: list[str]) -> None:
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-ac", "2", "-ar", "48000", *codec_args, "-y", path],
+        check=True,
+    )
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(source: str, output_format: str, runs: int) -> tuple[float, str]:
+    cpu = 0.0
+    stored = ""
+    for run in range(runs):
+        downloaded = os.path.join(_WORKDIR, f"_tmp_run{run}{os.path.splitext(source)[1]}")
+        shutil.copyfile(source, downloaded)
+        final_path = os.path.join(_WORKDIR, "music", f"Bench - {output_format} {run}.mp3")
+        before = _children_cpu()
+        stored, error = finalize_audio(
+            downloaded, final_path, quality="320", title="Bench", artist="Bench", album=None,
+            output_format=output_format,
+        )
+        cpu += _children_cpu() - before
+        if error:
+            raise RuntimeError(error)
+        os.remove(stored)
+    return cpu / runs, os.path.splitext(stored)[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=210, help="length of each track")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(_WORKDIR, "music"), exist_ok=True)
+    print(f"{'input':<6} {'policy':<7} {'stored':<7} {'CPU s/track':>12}")
+    for ext, codec_args in _SOURCES.items():
+        source = os.path.join(_WORKDIR, f"source.{ext}")
+        _make_source(source, args.seconds, codec_args)
+        for output_format in OUTPUT_FORMATS:
+            cpu, stored = measure(source, output_format, args.runs)
+            print(f"{ext:<6} {output_format:<7} {stored:<7} {cpu:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Average YouTube searches per track, with and without duration scoring.
+
+Replays yt-dlp flat search results (search_fixture.json) through
+downloader._search_with_fallbacks and counts the queries each track needs.
+Three scorers are compared:
+
+  tokens  title/channel tokens only (no duration known — the old behaviour)
+  veto    duration blended in for every candidate, so a perfect title match
+          that is far off the Spotify length is rejected
+  current the shipped scorer (duration breaks ties between perfect matches)
+
+The checked-in fixture is synthetic: hand-written results in yt-dlp's
+flat-entry format, with made-up video ids and filler entries, covering plain
+catalogue tracks, Spotify titles with remaster or feature suffixes YouTube
+leaves out, songs only uploaded as a music video with a long intro, and live
+versions ranked above the studio recording. It exercises the scorers on
+those cases; it is not a measurement of real search behaviour. --record
+replaces it with real YouTube results for the same tracks (and drops the
+"synthetic" flag), after which the numbers are a measurement.
+
+Run from backend/:
+
+    python bench/search_attempts.py            # replay the fixture
+    python bench/search_attempts.py --record   # re-record results from YouTube
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+from app import downloader  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_fixture.json")
+_FIELDS = ("id", "url", "title", "channel", "uploader", "duration")
+
+
+def _queries(track: dict) -> list[str]:
+    artist, title = track["artist"], track["title"]
+    return [f"{artist} - {title}", f"{artist} {title}", title] if artist else [title]
+
+
+def record(tracks: list[dict]) -> None:
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL(downloader._ydl_search_opts()) as ydl:
+        for track in tracks:
+            results = {}
+            for query in _queries(track):
+                info = ydl.extract_info(f"ytsearch5:{query}", download=False) or {}
+                results[query] = [
+                    {k: e[k] for k in _FIELDS if e.get(k) is not None} for e in info.get("entries") or [] if e
+                ]
+            found = {e.get("id") for entries in results.values() for e in entries}
+            if track.get("expected_id") not in found:
+                track["expected_id"] = None  # needs checking by hand again
+            track["results"] = results
+            print(f"recorded {track['artist']} - {track['title']}")
+    with open(FIXTURE, "w") as f:
+        json.dump({"tracks": tracks}, f, indent=1)
+
+
+def replay(tracks: list[dict], mode: str) -> dict:
+    calls = 0
+    current: dict = {}
+
+    def fixture_search(query: str, n: int = 5) -> list[dict]:
+        nonlocal calls
+        calls += 1
+        return current["results"].get(query, [])
+
+    original_search, original_weight = downloader._search_candidates, downloader._DURATION_TIEBREAK_WEIGHT
+    downloader._search_candidates = fixture_search
+    if mode == "veto":
+        downloader._DURATION_TIEBREAK_WEIGHT = downloader._DURATION_WEIGHT  # same as the plain blend
+    found = correct = 0
+    try:
+        for track in tracks:
+            current = track
+            duration_ms = None if mode == "tokens" else track["duration_ms"]
+            with contextlib.redirect_stdout(io.StringIO()):
+                url = downloader._search_with_fallbacks(track["title"], track["artist"], duration_ms)
+            found += url is not None
+            correct += bool(url) and track.get("expected_id") is not None and url.endswith(track["expected_id"])
+    finally:
+        downloader._search_candidates, downloader._DURATION_TIEBREAK_WEIGHT = original_search, original_weight
+    return {"searches": calls / len(tracks), "found": found, "correct": correct}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="re-record search results from YouTube first")
+    args = parser.parse_args()
+
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    tracks = fixture["tracks"]
+    synthetic = fixture.get("synthetic", False) and not args.record
+    if args.record:
+        record(tracks)
+
+    checked = sum(1 for t in tracks if t.get("expected_id"))
+    print(f"{len(tracks)} tracks, {checked} with a known correct video")
+    if synthetic:
+        print("synthetic fixture — scorer behaviour on hand-written cases, not a measurement")
+    print()
+    print(f"{'scorer':<8} {'searches/track':>15} {'found':>7} {'correct':>8}")
+    for mode in ("tokens", "veto", "current"):
+        result = replay(tracks, mode)
+        print(f"{mode:<8} {result['searches']:>15.2f} {result['found']:>7} {result['correct']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+SQLite under concurrent imports, status polls and pipeline workers.
+
+Seeds a throwaway database, then for a fixed time runs at once:
+
+  importers  bulk-insert tracks in 500-row batches under write_lock, like a
+             CSV import (routers.import_csv._insert_batch)
+  pollers    the dashboard's reads: /api/status and the first /api/downloads page
+  workers    pipeline._claim_next_track + pipeline._finish, one track at a time
+
+and reports throughput, p50/p99 latencies and "database is locked" errors
+per role. --no-pragmas runs the same load on a connection without the WAL
+and pragma setup from database.py, for comparison (the driver's 30 s busy
+timeout from create_engine still applies).
+
+Run from backend/:
+
+    python bench/sqlite_concurrency.py [--seconds 8] [--tracks 200000] [--no-pragmas]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+_WORKDIR = tempfile.mkdtemp(prefix="sqlite-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_WORKDIR, "db.sqlite"))
+os.environ.setdefault("OUTPUT_DIR", os.path.join(_WORKDIR, "music"))
+
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app import database, pipeline  # noqa: E402
+from app.database import Track, engine, make_dedup_key, write_lock  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.routers.downloads import list_downloads  # noqa: E402
+from app.routers.status import get_status  # noqa: E402
+
+_BATCH = 500
+
+_stop = threading.Event()
+_results_lock = threading.Lock()
+_latencies: dict[str, list[float]] = {"import": [], "poll": [], "worker": []}
+_errors: dict[str, int] = {"import": 0, "poll": 0, "worker": 0}
+_counter = iter(range(10**9))
+
+
+def _rows(n: int, status: str) -> list[dict]:
+    rows = []
+    for _ in range(n):
+        i = next(_counter)
+        title, artist = f"Song {i}", f"Artist {i % 997}"
+        rows.append({
+            "spotify_id": f"{i:022d}",
+            "title": title,
+            "artist": artist,
+            "dedup_key": make_dedup_key(artist, title),
+            "status": status,
+            "source": "playlist",
+        })
+    return rows
+
+
+def seed(count: int) -> None:
+    with Session(engine) as session:
+        for start in range(0, count, 5000):
+            # A share of the seed is queued so the workers always have something to claim
+            session.exec(insert(Track), params=_rows(min(5000, count - start), "queued" if start % 20000 == 0 else "done"))
+        session.commit()
+
+
+def _timed(role: str, fn) -> None:
+    started = time.perf_counter()
+    try:
+        fn()
+    except OperationalError as exc:
+        if "locked" not in str(exc):
+            raise
+        with _results_lock:
+            _errors[role] += 1
+        return
+    with _results_lock:
+        _latencies[role].append(time.perf_counter() - started)
+
+
+def _import_batch() -> None:
+    with write_lock, Session(engine) as session:
+        session.exec(insert(Track), params=_rows(_BATCH, "queued"))
+        session.commit()
+
+
+def _poll() -> None:
+    get_status()
+    with Session(engine) as session:
+        list_downloads(page=1, limit=50, status=None, source=None, cursor=None, with_total=True, session=session)
+
+
+def _work() -> None:
+    job = pipeline._claim_next_track()
+    if job is not None:
+        pipeline._finish(job, "done")
+
+
+def _loop(role: str, fn, pause: float) -> None:
+    while not _stop.is_set():
+        _timed(role, fn)
+        time.sleep(pause)
+
+
+def _summary(role: str, seconds: float) -> str:
+    ms = sorted(s * 1000 for s in _latencies[role])
+    if not ms:
+        return f"{role:<8} no completed operations, {_errors[role]} locked"
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return (
+        f"{role:<8} {len(ms) / seconds:8.1f} ops/s  p50={statistics.median(ms):8.1f} ms"
+        f"  p99={p99:8.1f} ms  locked={_errors[role]}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--tracks", type=int, default=200_000, help="tracks seeded before the run")
+    parser.add_argument("--importers", type=int, default=2)
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-pragmas", action="store_true", help="skip the WAL/pragma connection setup")
+    args = parser.parse_args()
+
+    if args.no_pragmas:
+        # Before any connection is opened, so the file never switches to WAL
+        event.remove(engine, "connect", database._configure_connection)
+    database.create_db_and_tables()
+    run_migrations()
+    seed(args.tracks)
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    print(f"Seeded {args.tracks} tracks (journal_mode={journal})")
+
+    threads = (
+        [threading.Thread(target=_loop, args=("import", _import_batch, 0.05)) for _ in range(args.importers)]
+        + [threading.Thread(target=_loop, args=("poll", _poll, 0.1)) for _ in range(args.pollers)]
+        + [threading.Thread(target=_loop, args=("worker", _work, 0)) for _ in range(args.workers)]
+    )
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    _stop.set()
+    for thread in threads:
+        thread.join()
+
+    for role in ("import", "poll", "worker"):
+        print(_summary(role, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+API latency while 20 FLAC uploads are converted concurrently.
+
+Starts the backend with uvicorn against a throwaway database and music
+directory, measures /api/status latency at idle, then posts 20 FLAC files at
+once and keeps polling /api/status until every upload job has finished.
+The library watcher runs as in production, so index updates triggered by
+the new files are part of the load. Needs ffmpeg on PATH (to generate the
+FLACs and for the conversions) and httpx (requirements-dev.txt).
+
+Run from backend/:
+
+    python bench/upload_load.py [--files 20] [--seconds 180]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+_POLL_INTERVAL = 0.05
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_flac(path: str, seconds: int, frequency: int) -> None:
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={seconds}",
+         "-ac", "2", "-ar", "44100", "-y", path],
+        check=True,
+    )
+
+
+async def _sample_latency(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    samples = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/status")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(_POLL_INTERVAL)
+    return samples
+
+
+async def _upload(client: httpx.AsyncClient, path: str, index: int) -> str:
+    with open(path, "rb") as f:
+        response = await client.post(
+            "/api/upload",
+            files={"file": (f"track{index}.flac", f, "audio/flac")},
+            data={"title": f"Load Test {index}", "artist": "Bench"},
+        )
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+
+async def _wait_for_jobs(client: httpx.AsyncClient, job_ids: list[str]) -> list[dict]:
+    pending, finished = set(job_ids), []
+    while pending:
+        for job_id in list(pending):
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] != "running":
+                pending.discard(job_id)
+                finished.append(job)
+        await asyncio.sleep(0.2)
+    return finished
+
+
+def _summary(label: str, samples: list[float]) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"{label:<16} n={len(ms):<5} p50={statistics.median(ms):7.1f} ms  p95={p95:7.1f} ms  max={ms[-1]:7.1f} ms"
+
+
+async def _run(base_url: str, flac: str, files: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_latency(client, stop))
+        await asyncio.sleep(3)
+        stop.set()
+        idle = await sampler
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_latency(client, stop))
+        started = time.perf_counter()
+        job_ids = await asyncio.gather(*(_upload(client, flac, i) for i in range(files)))
+        accepted = time.perf_counter() - started
+        jobs = await _wait_for_jobs(client, job_ids)
+        converted = time.perf_counter() - started
+        stop.set()
+        busy = await sampler
+
+    failed = [j for j in jobs if j["status"] != "done"]
+    print(f"{files} uploads accepted in {accepted:.1f}s, converted in {converted:.1f}s, {len(failed)} failed")
+    print(_summary("/api/status idle", idle))
+    print(_summary("/api/status busy", busy))
+    for job in failed:
+        print(f"  failed: {job['error']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--seconds", type=int, default=180, help="length of each FLAC")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="upload-load-")
+    flac = os.path.join(workdir, "source.flac")
+    _make_flac(flac, args.seconds, 440)
+    os.makedirs(os.path.join(workdir, "music"))  # the watcher only starts on an existing folder
+
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DB_PATH": os.path.join(workdir, "db.sqlite"),
+        "OUTPUT_DIR": os.path.join(workdir, "music"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+        env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/api/status").raise_for_status()
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        asyncio.run(_run(base_url, flac, args.files))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# pytest.ini puts this directory on sys.path when pytest runs from here (or is
+# given a path below it); this conftest does the same for a plain ``pytest``
+# from the repository root, where pytest.ini is not picked up.
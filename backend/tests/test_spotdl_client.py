@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from spotipy.exceptions import SpotifyException
+
+from app import spotdl_client
+from app.spotdl_client import fetch_playlist_info, spotify_client
+
+PLAYLIST_ID = "37i9dQZF1DXcBWIGoYBM5M"
+PLAYLIST_URL = f"https://open.spotify.com/playlist/{PLAYLIST_ID}"
+
+
+class StubSpotify:
+    """A local Spotify Web API serving one playlist, with scriptable 429s."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.snapshot_id = "snap-1"
+        self.rate_limits: dict[int, list[str]] = {}  # offset -> Retry-After values, served in turn
+        self.requests: list[tuple[float, int, int]] = []  # (time, offset, status)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.prefix = f"http://127.0.0.1:{self.server.server_port}/v1/"
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        url = urlparse(request.path)
+        query = parse_qs(url.query)
+        if re.fullmatch(rf"/v1/playlists/{PLAYLIST_ID}", url.path):
+            return self._send(request, 200, {"name": "Stub Playlist", "snapshot_id": self.snapshot_id})
+        if not re.fullmatch(rf"/v1/playlists/{PLAYLIST_ID}/(items|tracks)", url.path):
+            return self._send(request, 404, {"error": {"status": 404, "message": "Not found"}})
+
+        offset, limit = int(query["offset"][0]), int(query["limit"][0])
+        with self._lock:
+            pending = self.rate_limits.get(offset)
+            retry_after = pending.pop(0) if pending else None
+            self.requests.append((time.monotonic(), offset, 429 if retry_after is not None else 200))
+        if retry_after is not None:
+            return self._send(
+                request, 429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                headers={"Retry-After": retry_after},
+            )
+
+        # Later pages answer first, so results arrive out of playlist order
+        time.sleep(0.02 * max(0, 5 - offset // limit))
+        end = min(offset + limit, self.total)
+        self._send(request, 200, {
+            "items": [self._item(i) for i in range(offset, end)],
+            "total": self.total,
+            "next": f"{self.prefix}playlists/{PLAYLIST_ID}/items?offset={end}" if end < self.total else None,
+        })
+
+    @staticmethod
+    def _item(index: int) -> dict:
+        return {"track": {
+            "id": f"track{index:04d}",
+            "name": f"Song {index}",
+            "duration_ms": 180000 + index,
+            "artists": [{"name": "Artist"}],
+            "album": {"name": "Album"},
+            "external_ids": {"isrc": f"USRC1{index:07d}"},
+        }}
+
+    @staticmethod
+    def _send(request: BaseHTTPRequestHandler, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def client(self):
+        sp = spotify_client("test-token")
+        sp.prefix = self.prefix
+        return sp
+
+    def page_requests(self, offset: int) -> list[tuple[float, int]]:
+        return [(at, status) for at, o, status in self.requests if o == offset]
+
+
+@pytest.fixture
+def make_stub():
+    servers = []
+
+    def make(total: int) -> StubSpotify:
+        stub = StubSpotify(total)
+        threading.Thread(target=stub.server.serve_forever, daemon=True).start()
+        servers.append(stub.server)
+        return stub
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_gate(monkeypatch):
+    monkeypatch.setattr(spotdl_client, "_blocked_until", 0.0)
+
+
+def test_pages_are_reassembled_in_playlist_order(make_stub):
+    stub = make_stub(total=450)
+    progress = []
+
+    info = fetch_playlist_info(stub.client(), PLAYLIST_URL, progress_fn=lambda done, total: progress.append((done, total)))
+
+    assert info.name == "Stub Playlist"
+    assert info.snapshot_id == "snap-1"
+    assert [t.spotify_id for t in info.tracks] == [f"track{i:04d}" for i in range(450)]
+    assert info.tracks[7].duration_ms == 180007
+    assert info.tracks[7].isrc == "USRC10000007"
+    assert sorted(o for _, o, _ in stub.requests) == [0, 100, 200, 300, 400]
+    assert progress[-1] == (450, 450)
+
+
+def test_unchanged_snapshot_skips_paging(make_stub):
+    stub = make_stub(total=450)
+
+    info = fetch_playlist_info(stub.client(), PLAYLIST_URL, known_snapshot_id="snap-1")
+
+    assert info.unchanged
+    assert info.tracks == []
+    assert stub.requests == []
+
+
+def test_retry_after_pauses_and_retries_the_page(make_stub):
+    stub = make_stub(total=250)
+    stub.rate_limits[100] = ["1"]
+
+    info = fetch_playlist_info(stub.client(), PLAYLIST_URL)
+
+    assert [t.spotify_id for t in info.tracks] == [f"track{i:04d}" for i in range(250)]
+    (limited_at, first), (retried_at, second) = stub.page_requests(100)
+    assert (first, second) == (429, 200)
+    assert retried_at - limited_at >= 1.0
+
+
+def test_retry_after_blocks_other_threads(make_stub):
+    stub = make_stub(total=100)
+    spotdl_client._block_for(0.5)
+    started = time.monotonic()
+
+    fetch_playlist_info(stub.client(), PLAYLIST_URL)
+
+    assert time.monotonic() - started >= 0.5
+
+
+def test_gives_up_after_max_rate_limit_retries(make_stub, monkeypatch):
+    monkeypatch.setattr(spotdl_client, "_MAX_RATE_LIMIT_RETRIES", 2)
+    stub = make_stub(total=100)
+    stub.rate_limits[0] = ["0"] * 10
+
+    with pytest.raises(SpotifyException) as excinfo:
+        fetch_playlist_info(stub.client(), PLAYLIST_URL)
+
+    assert excinfo.value.http_status == 429
+    assert len(stub.page_requests(0)) == 3
@@ -23,9 +23,15 @@ export interface Track {
   title: string;
   artist: string | null;
   album: string | null;
-  status: "queued" | "downloading" | "done" | "failed" | "skipped";
+  duration_ms: number | null;
+  isrc: string | null;
+  status: "queued" | "downloading" | "done" | "failed" | "skipped" | "missing";
   file_path: string | null;
+  youtube_url: string | null;
   error_msg: string | null;
+  error_kind: "rate_limited" | "not_found" | "extractor" | "ffmpeg" | "invalid" | "error" | null;
+  attempts: number;
+  next_attempt_at: string | null;
   source: "playlist" | "manual";
   requested_at: string;
   downloaded_at: string | null;
@@ -33,17 +39,32 @@ export interface Track {
 
 export interface DownloadsResponse {
   items: Track[];
-  total: number;
+  /** null when requested with withTotal: false */
+  total: number | null;
   page: number;
   limit: number;
+  /** Pass as `cursor` to fetch the next page; null on the last page */
+  next_cursor: string | null;
+}
+
+export interface InFlightTrack {
+  track_id: number;
+  title: string;
+  artist: string | null;
+  stage: "searching" | "waiting" | "downloading" | "transcoding";
 }
 
 export interface StatusResponse {
-  currently_downloading: { track_id: number; title: string; artist: string | null } | null;
+  currently_downloading: InFlightTrack | null;
+  downloading: InFlightTrack[];
+  workers: { resolve: number; fetch: number; transcode: number };
+  stage_queues: { fetch: number; transcode: number };
   total_done: number;
   total_failed: number;
   total_skipped: number;
   queue_length: number;
+  search_cache: { hits: number; misses: number; hit_rate: number | null };
+  ydl_pool: { builds: number; reuses: number; avg_build_ms: number; saved_ms: number };
 }
 
 export interface Settings {
@@ -52,6 +73,11 @@ export interface Settings {
   file_template: string;
   sleep_between_downloads: number;
   max_retries: number;
+  search_workers: number;
+  download_workers: number;
+  transcode_workers: number;
+  fingerprint_dedup: boolean;
+  output_format: "mp3" | "native";
 }
 
 export interface ImportResult {
@@ -86,15 +112,19 @@ export interface AuthStatus {
 
 export const getDownloads = (params?: {
   page?: number;
+  cursor?: string;
   limit?: number;
   status?: string;
   source?: string;
+  withTotal?: boolean;
 }) => {
   const qs = new URLSearchParams();
   if (params?.page) qs.set("page", String(params.page));
+  if (params?.cursor) qs.set("cursor", params.cursor);
   if (params?.limit) qs.set("limit", String(params.limit));
   if (params?.status) qs.set("status", params.status);
   if (params?.source) qs.set("source", params.source);
+  if (params?.withTotal === false) qs.set("with_total", "false");
   return apiFetch<DownloadsResponse>(`/downloads?${qs}`);
 };
 
@@ -114,8 +144,76 @@ export const updateSettings = (body: Partial<Omit<Settings, "id">>) =>
     body: JSON.stringify(body),
   });
 
+export interface Job<T> {
+  id: string;
+  kind: string;
+  status: "running" | "done" | "failed";
+  progress: number | null;
+  processed: number;
+  result: T | null;
+  error: string | null;
+  created_at: string;
+  finished_at: string | null;
+}
+
+export const getJob = <T,>(id: string) => apiFetch<Job<T>>(`/jobs/${id}`);
+
+/** Poll a background job until it finishes and return its result. */
+const pollJob = async <T,>(
+  id: string,
+  onProgress?: (job: Job<T>) => void,
+  intervalMs = 1000
+): Promise<T> => {
+  for (;;) {
+    const job = await getJob<T>(id);
+    onProgress?.(job);
+    if (job.status === "done") return job.result as T;
+    if (job.status === "failed") throw new Error(job.error ?? "Job failed");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
+/**
+ * Follow a background job via server-sent events and return its result.
+ * Falls back to polling when the event stream can't be opened.
+ */
+export const waitForJob = <T,>(
+  id: string,
+  onProgress?: (job: Job<T>) => void,
+  intervalMs = 1000
+): Promise<T> => {
+  if (typeof EventSource === "undefined") return pollJob(id, onProgress, intervalMs);
+  return new Promise<T>((resolve, reject) => {
+    const source = new EventSource(`${BASE}/jobs/${id}/events`);
+    source.onmessage = (event) => {
+      const job = JSON.parse(event.data) as Job<T>;
+      onProgress?.(job);
+      if (job.status === "done") {
+        source.close();
+        resolve(job.result as T);
+      } else if (job.status === "failed") {
+        source.close();
+        reject(new Error(job.error ?? "Job failed"));
+      }
+    };
+    source.onerror = () => {
+      source.close();
+      pollJob(id, onProgress, intervalMs).then(resolve, reject);
+    };
+  });
+};
+
+/** POST to an endpoint that answers with a job id and wait for the job's result. */
+const runJob = async <T,>(path: string, init?: RequestInit): Promise<T> => {
+  const { job_id } = await apiFetch<{ job_id: string }>(path, { method: "POST", ...init });
+  return waitForJob<T>(job_id);
+};
+
 /** Upload a CSV file and queue its tracks for download. */
-export const importCsv = async (file: File): Promise<ImportResult> => {
+export const importCsv = async (
+  file: File,
+  onProgress?: (job: Job<ImportResult>) => void
+): Promise<ImportResult> => {
   const form = new FormData();
   form.append("file", file);
   const res = await fetch(`${BASE}/import/csv`, { method: "POST", body: form });
@@ -123,22 +221,19 @@ export const importCsv = async (file: File): Promise<ImportResult> => {
     const text = await res.text().catch(() => res.statusText);
     throw new Error(`${res.status} ${text}`);
   }
-  return res.json() as Promise<ImportResult>;
+  const { job_id } = (await res.json()) as { job_id: string };
+  return waitForJob<ImportResult>(job_id, onProgress);
 };
 
 export const getPlaylists = () => apiFetch<MonitoredPlaylist[]>("/playlists");
 
 export const addPlaylist = (url: string) =>
-  apiFetch<MonitoredPlaylist>("/playlists", {
-    method: "POST",
-    body: JSON.stringify({ url }),
-  });
+  runJob<MonitoredPlaylist>("/playlists", { body: JSON.stringify({ url }) });
 
 export const deletePlaylist = (id: number) =>
   apiFetch<{ ok: boolean }>("/playlists/" + id, { method: "DELETE" });
 
-export const syncPlaylist = (id: number) =>
-  apiFetch<SyncResult>("/playlists/" + id + "/sync", { method: "POST" });
+export const syncPlaylist = (id: number) => runJob<SyncResult>("/playlists/" + id + "/sync");
 
 export const getAuthStatus = () => apiFetch<AuthStatus>("/auth/status");
 
@@ -149,7 +244,9 @@ export const logout = () => apiFetch<{ ok: boolean }>("/auth/logout", { method:
 export interface UploadResult {
   ok: boolean;
   file_path: string;
+  job_id?: string;
   message?: string;
+  duplicate_of?: string | null;
 }
 
 export const uploadFile = async (
@@ -170,5 +267,32 @@ export const uploadFile = async (
     const text = await res.text().catch(() => res.statusText);
     throw new Error(`${res.status} ${text}`);
   }
-  return res.json() as Promise<UploadResult>;
+  const accepted = (await res.json()) as UploadResult;
+  // Conversion runs in the background; wait for it so errors still surface here
+  return accepted.job_id ? waitForJob<UploadResult>(accepted.job_id) : accepted;
+};
+
+export interface BulkUploadResult {
+  ok: boolean;
+  total: number;
+  imported: number;
+  skipped: number;
+  failed: number;
+  errors: string[];
+  duplicates: string[];
+}
+
+export const uploadBulk = async (
+  files: File[],
+  onProgress?: (job: Job<BulkUploadResult>) => void
+): Promise<BulkUploadResult> => {
+  const form = new FormData();
+  files.forEach((file) => form.append("files", file));
+  const res = await fetch(`${BASE}/upload/bulk`, { method: "POST", body: form });
+  if (!res.ok) {
+    const text = await res.text().catch(() => res.statusText);
+    throw new Error(`${res.status} ${text}`);
+  }
+  const { job_id } = (await res.json()) as { job_id: string };
+  return waitForJob<BulkUploadResult>(job_id, onProgress);
 };
@@ -8,8 +8,8 @@ interface Props {
 export default function StatusBar({ status }: Props) {
   const { t } = useTranslation();
   
-  if (!status?.currently_downloading) return null;
-  const { title, artist } = status.currently_downloading;
+  const downloading = status?.downloading ?? (status?.currently_downloading ? [status.currently_downloading] : []);
+  if (downloading.length === 0) return null;
 
   return (
     <div className="flex items-center gap-3 bg-ctp-surface0 border border-ctp-teal/30 rounded-xl px-4 py-3 mb-4">
@@ -17,11 +17,14 @@ export default function StatusBar({ status }: Props) {
       <div className="min-w-0">
         <p className="text-xs text-ctp-subtext0 font-medium uppercase tracking-wide">
           {t("status.downloading")}
+          {downloading.length > 1 && ` (${downloading.length})`}
         </p>
-        <p className="text-sm text-ctp-text font-semibold truncate">
-          {artist ? `${artist} – ${title}` : title}
-        </p>
+        {downloading.map(({ track_id, title, artist }) => (
+          <p key={track_id} className="text-sm text-ctp-text font-semibold truncate">
+            {artist ? `${artist} – ${title}` : title}
+          </p>
+        ))}
       </div>
     </div>
   );
-}
\ No newline at end of file
+}
@@ -15,6 +15,7 @@ const STATUS_COLORS: Record<Track["status"], string> = {
   downloading: "bg-ctp-blue/20 text-ctp-blue border-ctp-blue/30",
   failed:      "bg-ctp-red/20 text-ctp-red border-ctp-red/30",
   skipped:     "bg-ctp-overlay0/20 text-ctp-subtext0 border-ctp-overlay0/30",
+  missing:     "bg-ctp-peach/20 text-ctp-peach border-ctp-peach/30",
 };
 
 function StatusBadge({ status }: { status: Track["status"] }) {
@@ -63,15 +64,35 @@ export default function Dashboard() {
   const [filterStatus, setFilterStatus] = useState<string>("");
   const [filterSource, setFilterSource] = useState<string>("");
   const [page, setPage] = useState(1);
+  // cursors[i] fetches page i + 1; the first page needs none
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
 
   const fetchAll = useCallback(async () => {
     const [s, d] = await Promise.all([
       getStatus().catch(() => null),
-      getDownloads({ page, limit: 50, status: filterStatus || undefined, source: filterSource || undefined }).catch(() => null),
+      getDownloads({
+        cursor: cursors[page - 1],
+        limit: 50,
+        status: filterStatus || undefined,
+        source: filterSource || undefined,
+      }).catch(() => null),
     ]);
     if (s) setStatus(s);
     if (d) setData(d);
-  }, [page, filterStatus, filterSource]);
+  }, [page, cursors, filterStatus, filterSource]);
+
+  const goToPage = (next: number) => {
+    if (next > page && data?.next_cursor) {
+      const cursor = data.next_cursor;
+      setCursors((prev) => [...prev.slice(0, page), cursor]);
+    }
+    setPage(next);
+  };
+
+  const resetPaging = () => {
+    setCursors([undefined]);
+    setPage(1);
+  };
 
   useEffect(() => {
     fetchAll();
@@ -106,7 +127,7 @@ export default function Dashboard() {
             return (
               <button
                 key={label}
-                onClick={() => { setFilterSource(val); setPage(1); }}
+                onClick={() => { setFilterSource(val); resetPaging(); }}
                 className={`px-3 py-1 rounded-full text-xs font-medium border transition-colors ${
                   filterSource === val
                     ? "bg-ctp-mauve/20 text-ctp-mauve border-ctp-mauve/40"
@@ -119,10 +140,10 @@ export default function Dashboard() {
           })}
         </div>
         <div className="flex gap-2 flex-wrap">
-          {["", "done", "queued", "downloading", "failed", "skipped"].map((s) => (
+          {["", "done", "queued", "downloading", "failed", "skipped", "missing"].map((s) => (
             <button
               key={s}
-              onClick={() => { setFilterStatus(s); setPage(1); }}
+              onClick={() => { setFilterStatus(s); resetPaging(); }}
               className={`px-3 py-1 rounded-full text-xs font-medium border transition-colors ${
                 filterStatus === s
                   ? "bg-ctp-blue/20 text-ctp-blue border-ctp-blue/40"
@@ -209,10 +230,10 @@ export default function Dashboard() {
       </div>
 
       {/* Pagination */}
-      {data && data.total > data.limit && (
+      {data && (page > 1 || data.next_cursor) && (
         <div className="flex items-center justify-between text-sm">
           <button
-            onClick={() => setPage((p) => Math.max(1, p - 1))}
+            onClick={() => goToPage(Math.max(1, page - 1))}
             disabled={page === 1}
             className="px-3 py-1.5 rounded-lg bg-ctp-surface0 text-ctp-text disabled:opacity-40 hover:bg-ctp-surface1 transition-colors"
           >
@@ -222,8 +243,8 @@ export default function Dashboard() {
             {t("dashboard.page")} {page} · {data.total} {t("dashboard.total")}
           </span>
           <button
-            onClick={() => setPage((p) => p + 1)}
-            disabled={page * data.limit >= data.total}
+            onClick={() => goToPage(page + 1)}
+            disabled={!data.next_cursor}
             className="px-3 py-1.5 rounded-lg bg-ctp-surface0 text-ctp-text disabled:opacity-40 hover:bg-ctp-surface1 transition-colors"
           >
             {t("dashboard.next")} →
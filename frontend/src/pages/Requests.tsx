@@ -9,6 +9,7 @@ const STATUS_COLORS: Record<Track["status"], string> = {
   downloading: "bg-ctp-blue/20 text-ctp-blue border-ctp-blue/30",
   failed:      "bg-ctp-red/20 text-ctp-red border-ctp-red/30",
   skipped:     "bg-ctp-overlay0/20 text-ctp-subtext0 border-ctp-overlay0/30",
+  missing:     "bg-ctp-peach/20 text-ctp-peach border-ctp-peach/30",
 };
 
 function StatusBadge({ status }: { status: Track["status"] }) {
@@ -32,7 +33,7 @@ export default function Requests() {
   const [showUploadModal, setShowUploadModal] = useState(false);
 
   const fetchManual = async () => {
-    const data = await getDownloads({ source: "manual", limit: 50 }).catch(() => null);
+    const data = await getDownloads({ source: "manual", limit: 50, withTotal: false }).catch(() => null);
     if (data) setManualTracks(data.items);
   };
 
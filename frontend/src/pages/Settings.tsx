@@ -19,6 +19,13 @@ import {
 import { supportedLanguages } from "../i18n";
 
 const QUALITIES = ["128", "192", "256", "320"];
+const OUTPUT_FORMATS = ["mp3", "native"] as const;
+
+const WORKER_FIELDS = [
+  { key: "search_workers", label: "settings.searchWorkers" },
+  { key: "download_workers", label: "settings.downloadWorkers" },
+  { key: "transcode_workers", label: "settings.transcodeWorkers" },
+] as const;
 
 function previewFilename(template: string): string {
   return (
@@ -219,6 +226,27 @@ export default function SettingsPage() {
           </div>
         </div>
 
+        {/* Output format */}
+        <div className="space-y-1">
+          <label className="text-xs font-medium text-ctp-subtext0">{t("settings.outputFormat")}</label>
+          <div className="flex gap-2">
+            {OUTPUT_FORMATS.map((f) => (
+              <button
+                key={f}
+                onClick={() => set("output_format", f)}
+                className={`flex-1 py-2 rounded-lg text-sm font-semibold border transition-colors ${
+                  (form.output_format ?? "mp3") === f
+                    ? "bg-ctp-green/20 text-ctp-green border-ctp-green/40"
+                    : "bg-ctp-surface0 text-ctp-subtext0 border-ctp-surface1 hover:border-ctp-overlay0"
+                }`}
+              >
+                {t(`settings.outputFormats.${f}`)}
+              </button>
+            ))}
+          </div>
+          <p className="text-xs text-ctp-overlay0">{t("settings.outputFormatDescription")}</p>
+        </div>
+
         {/* Sleep */}
         <div className="space-y-1">
           <label className="text-xs font-medium text-ctp-subtext0">
@@ -251,6 +279,45 @@ export default function SettingsPage() {
             className="w-24 bg-ctp-surface0 border border-ctp-surface1 rounded-lg px-3 py-2 text-sm text-ctp-text focus:outline-none focus:border-ctp-blue transition-colors"
           />
         </div>
+
+        {/* Pipeline concurrency */}
+        <div className="space-y-1">
+          <label className="text-xs font-medium text-ctp-subtext0">{t("settings.concurrency")}</label>
+          <div className="flex gap-3">
+            {WORKER_FIELDS.map(({ key, label }) => (
+              <div key={key} className="space-y-1">
+                <p className="text-xs text-ctp-overlay0">{t(label)}</p>
+                <input
+                  type="number"
+                  min={1}
+                  max={8}
+                  value={form[key] ?? 2}
+                  onChange={(e) => set(key, parseInt(e.target.value))}
+                  className="w-24 bg-ctp-surface0 border border-ctp-surface1 rounded-lg px-3 py-2 text-sm text-ctp-text focus:outline-none focus:border-ctp-blue transition-colors"
+                />
+              </div>
+            ))}
+          </div>
+          <p className="text-xs text-ctp-overlay0">
+            {t("settings.concurrencyDescription")}
+          </p>
+        </div>
+
+        {/* Fingerprint dedup */}
+        <div className="space-y-1">
+          <label className="flex items-center gap-2 text-xs font-medium text-ctp-subtext0">
+            <input
+              type="checkbox"
+              checked={form.fingerprint_dedup ?? false}
+              onChange={(e) => set("fingerprint_dedup", e.target.checked)}
+              className="accent-ctp-peach"
+            />
+            {t("settings.fingerprintDedup")}
+          </label>
+          <p className="text-xs text-ctp-overlay0">
+            {t("settings.fingerprintDescription")}
+          </p>
+        </div>
       </section>
 
       {/* File naming */}